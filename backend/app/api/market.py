@@ -35,6 +35,7 @@ async def get_klines(
     start_time: Optional[int] = Query(None, description="开始时间戳"),
     end_time: Optional[int] = Query(None, description="结束时间戳"),
     use_cache: bool = Query(True, description="是否使用缓存"),
+    before_open_time: Optional[int] = Query(None, description="翻页游标，返回该开盘时间之前的数据"),
     service: MarketDataService = Depends(get_market_service)
 ):
     """
@@ -46,6 +47,7 @@ async def get_klines(
     - **start_time**: 开始时间戳 (毫秒)
     - **end_time**: 结束时间戳 (毫秒)
     - **use_cache**: 是否使用数据库缓存
+    - **before_open_time**: 翻页游标，传入上一页第一条K线的开盘时间 (毫秒)
     """
     try:
         # 验证交易对
@@ -71,7 +73,8 @@ async def get_klines(
             limit=limit,
             start_time=start_time,
             end_time=end_time,
-            use_cache=use_cache
+            use_cache=use_cache,
+            before_open_time=before_open_time
         )
         
         return KLineResponse(
@@ -251,11 +251,13 @@ async def validate_config(
     验证策略配置
     """
     try:
-        is_valid = engine.validate_config(config)
+        errors = config.parameter_errors()
+        is_valid = not errors
         
         return {
             "success": True,
             "valid": is_valid,
+            "errors": errors,
             "config": config,
             "message": "Configuration is valid" if is_valid else "Configuration validation failed"
         }
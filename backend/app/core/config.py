@@ -23,6 +23,7 @@ class Settings(BaseModel):
     # Database Settings
     sqlite_path: str = "./data/trading.db"
     redis_url: str = "redis://localhost:6379"
+    db_batch_size: int = 1000
 
     # Proxy Settings
     proxy_url: Optional[str] = None
@@ -34,8 +35,11 @@ class Settings(BaseModel):
     binance_public_data_only: bool = True
     binance_base_url: str = "https://api.binance.com"
     binance_testnet_url: str = "https://testnet.binance.vision"
+    binance_ws_url: str = "wss://stream.binance.com:9443"
     binance_symbols: List[str] = ["BTCUSDT", "ETHUSDT"]
     binance_default_interval: str = "4h"
+    binance_requests_per_minute: int = 1200
+    binance_max_concurrency: int = 8
 
     # Proxy Settings
     proxy_url: Optional[str] = None
@@ -54,6 +58,8 @@ class Settings(BaseModel):
     rsi_overbought: int = 70
     bb_period: int = 20
     bb_std_dev: float = 2.0
+    # numba并行内核的线程层优先级
+    numba_threading_layer_priority: List[str] = ['omp', 'tbb', 'workqueue']
 
     # Backtest Settings
     backtest_initial_balance: float = 10000.0
@@ -97,7 +103,8 @@ def create_settings() -> Settings:
         db_config = yaml_config['database']
         flat_config.update({
             'sqlite_path': db_config.get('sqlite_path', './data/trading.db'),
-            'redis_url': db_config.get('redis_url', 'redis://localhost:6379')
+            'redis_url': db_config.get('redis_url', 'redis://localhost:6379'),
+            'db_batch_size': db_config.get('batch_size', 1000)
         })
 
     if 'binance' in yaml_config:
@@ -109,8 +116,11 @@ def create_settings() -> Settings:
             'binance_public_data_only': binance_config.get('public_data_only', True),
             'binance_base_url': binance_config.get('base_url', 'https://api.binance.com'),
             'binance_testnet_url': binance_config.get('testnet_url', 'https://testnet.binance.vision'),
+            'binance_ws_url': binance_config.get('ws_url', 'wss://stream.binance.com:9443'),
             'binance_symbols': binance_config.get('symbols', ['BTCUSDT', 'ETHUSDT']),
-            'binance_default_interval': binance_config.get('default_interval', '4h')
+            'binance_default_interval': binance_config.get('default_interval', '4h'),
+            'binance_requests_per_minute': binance_config.get('requests_per_minute', 1200),
+            'binance_max_concurrency': binance_config.get('max_concurrency', 8)
         })
 
     # 添加代理配置支持
@@ -170,6 +180,10 @@ def get_settings() -> Settings:
     """获取配置实例（缓存）"""
     return create_settings()
 
+def worker_count() -> int:
+    """从环境变量读取uvicorn工作进程数（WEB_CONCURRENCY或UVICORN_WORKERS，默认1）"""
+    return max(1, int(os.getenv("WEB_CONCURRENCY") or os.getenv("UVICORN_WORKERS") or 1))
+
 # 配置检测函数
 def detect_api_mode() -> str:
     """检测API配置模式"""
@@ -193,7 +207,8 @@ def get_binance_config() -> dict:
         'mode': mode,
         'symbols': settings.binance_symbols,
         'default_interval': settings.binance_default_interval,
-        'testnet': settings.binance_testnet
+        'testnet': settings.binance_testnet,
+        'ws_url': settings.binance_ws_url
     }
 
     if mode == "FULL_MODE":
@@ -68,6 +68,12 @@ async def init_database():
 
     logger.info("Database initialized successfully")
 
+async def get_session_maker() -> sessionmaker:
+    """获取会话工厂（未初始化时先初始化数据库）"""
+    if async_session_maker is None:
+        await init_database()
+    return async_session_maker
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """获取数据库会话"""
     if async_session_maker is None:
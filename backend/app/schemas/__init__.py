@@ -2,14 +2,14 @@
 Pydantic模式定义模块
 """
 
-from .market import KLineData, KLineRequest, KLineResponse, TickerData, MarketOverview
+from .market import KLineData, KLineFrame, KLineRequest, KLineResponse, TickerData, MarketOverview
 from .strategy import (
     StrategyConfig, SignalData, TechnicalIndicators, 
     StrategySignalRequest, StrategySignalResponse, StrategyStatus
 )
 
 __all__ = [
-    'KLineData', 'KLineRequest', 'KLineResponse', 'TickerData', 'MarketOverview',
+    'KLineData', 'KLineFrame', 'KLineRequest', 'KLineResponse', 'TickerData', 'MarketOverview',
     'StrategyConfig', 'SignalData', 'TechnicalIndicators', 
     'StrategySignalRequest', 'StrategySignalResponse', 'StrategyStatus'
 ]
@@ -2,8 +2,10 @@
 市场数据相关的Pydantic模式
 """
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence
+import numpy as np
 from pydantic import BaseModel, Field
 
 class KLineData(BaseModel):
@@ -18,6 +20,91 @@ class KLineData(BaseModel):
     close_price: float = Field(..., description="收盘价")
     volume: float = Field(..., description="交易量")
 
+@dataclass
+class KLineFrame:
+    """K线列式数据（每个字段一个数组，便于向量化计算）"""
+    symbol: str
+    timeframe: str
+    open_time: np.ndarray
+    close_time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    @classmethod
+    def empty(cls, symbol: str, timeframe: str) -> "KLineFrame":
+        """创建空数据帧"""
+        times = np.empty(0, dtype=np.int64)
+        prices = np.empty(0, dtype=np.float64)
+        return cls(symbol, timeframe, times, times, prices, prices, prices, prices, prices)
+
+    @classmethod
+    def from_binance(cls, symbol: str, timeframe: str, raw_klines: Sequence[Sequence]) -> "KLineFrame":
+        """从币安原始K线数组直接构建列数据"""
+        if not raw_klines:
+            return cls.empty(symbol, timeframe)
+
+        table = np.array([row[:7] for row in raw_klines], dtype=object)
+        return cls(
+            symbol=symbol,
+            timeframe=timeframe,
+            open_time=table[:, 0].astype(np.int64),
+            close_time=table[:, 6].astype(np.int64),
+            open=table[:, 1].astype(np.float64),
+            high=table[:, 2].astype(np.float64),
+            low=table[:, 3].astype(np.float64),
+            close=table[:, 4].astype(np.float64),
+            volume=table[:, 5].astype(np.float64)
+        )
+
+    @classmethod
+    def from_rows(cls, klines: List[KLineData], symbol: str, timeframe: str) -> "KLineFrame":
+        """从KLineData列表构建列数据"""
+        n = len(klines)
+        return cls(
+            symbol=symbol,
+            timeframe=timeframe,
+            open_time=np.fromiter((k.open_time for k in klines), dtype=np.int64, count=n),
+            close_time=np.fromiter((k.close_time for k in klines), dtype=np.int64, count=n),
+            open=np.fromiter((k.open_price for k in klines), dtype=np.float64, count=n),
+            high=np.fromiter((k.high_price for k in klines), dtype=np.float64, count=n),
+            low=np.fromiter((k.low_price for k in klines), dtype=np.float64, count=n),
+            close=np.fromiter((k.close_price for k in klines), dtype=np.float64, count=n),
+            volume=np.fromiter((k.volume for k in klines), dtype=np.float64, count=n)
+        )
+
+    def columns(self) -> zip:
+        """按行迭代各列的Python原生值"""
+        return zip(
+            self.open_time.tolist(), self.close_time.tolist(),
+            self.open.tolist(), self.high.tolist(), self.low.tolist(),
+            self.close.tolist(), self.volume.tolist()
+        )
+
+    def rows(self) -> List[KLineData]:
+        """转换为KLineData列表（兼容旧调用方）"""
+        # 列数据类型已确定，跳过逐行校验
+        return [
+            KLineData.construct(
+                symbol=self.symbol,
+                timeframe=self.timeframe,
+                open_time=open_time,
+                close_time=close_time,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                volume=volume
+            )
+            for open_time, close_time, open_price, high_price, low_price, close_price, volume
+            in self.columns()
+        ]
+
 class KLineRequest(BaseModel):
     """K线数据请求"""
     symbol: str = Field(..., description="交易对符号", example="BTCUSDT")
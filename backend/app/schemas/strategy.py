@@ -53,6 +53,41 @@ class StrategyConfig(BaseModel):
     stop_loss_percent: float = Field(default=2.0, description="止损百分比")
     take_profit_percent: float = Field(default=4.0, description="止盈百分比")
     max_position_size: float = Field(default=0.1, description="最大仓位比例")
+    
+    def parameter_errors(self) -> List[str]:
+        """
+        检查参数范围（不在模型构建时执行，请求体中的非法配置由调用方处理）
+
+        Returns:
+            不满足的规则说明列表，为空表示配置合法
+        """
+        errors = []
+        
+        # 验证MACD参数
+        if self.macd_fast_period >= self.macd_slow_period:
+            errors.append("MACD快线周期必须小于慢线周期")
+        
+        # 验证RSI参数
+        if not (1 <= self.rsi_period <= 100):
+            errors.append("RSI周期必须在1-100之间")
+        if not (0 <= self.rsi_oversold < self.rsi_overbought <= 100):
+            errors.append("RSI阈值必须满足 0 <= 超卖 < 超买 <= 100")
+        
+        # 验证布林带参数
+        if not (1 <= self.bb_period <= 200):
+            errors.append("布林带周期必须在1-200之间")
+        if not (0.1 <= self.bb_std_dev <= 5.0):
+            errors.append("布林带标准差必须在0.1-5.0之间")
+        
+        # 验证风险管理参数
+        if not (0 < self.stop_loss_percent <= 50):
+            errors.append("止损百分比必须在0-50之间")
+        if not (0 < self.take_profit_percent <= 100):
+            errors.append("止盈百分比必须在0-100之间")
+        if not (0 < self.max_position_size <= 1):
+            errors.append("最大仓位比例必须在0-1之间")
+        
+        return errors
 
 class StrategySignalRequest(BaseModel):
     """策略信号请求"""
@@ -90,7 +90,8 @@ class BacktestEngine:
                 symbol=symbol,
                 timeframe=timeframe,
                 limit=len(klines),
-                config=strategy_config
+                config=strategy_config,
+                detail="signals_only"
             )
             
             if not analysis_result['success']:
@@ -6,30 +6,61 @@
 import asyncio
 import logging
 import time
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator, Sequence
 import aiohttp
-import json
-from binance import AsyncClient
+import orjson
+from binance import AsyncClient, BinanceSocketManager
 from binance.exceptions import BinanceAPIException
 
-from ..core.config import get_binance_config, get_settings
-from ..utils.proxy import ProxyManager
+from ..core.config import get_binance_config, get_settings, worker_count
+from ..utils.proxy import get_proxy_manager
+from ..utils.rate_limiter import WeightedTokenBucket
+
+try:
+    import simdjson
+except ImportError:  # pysimdjson为可选依赖
+    simdjson = None
+
+try:
+    import brotli  # noqa: F401  aiohttp需要brotli包才能解码br响应
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
 
 logger = logging.getLogger(__name__)
 
 class BinanceClient:
     """币安API客户端"""
 
+    # 实际使用的权重配额比例
+    RATE_LIMIT_HEADROOM = 0.9
+
     def __init__(self):
         self.config = get_binance_config()
         self.mode = self.config['mode']
         self.client: Optional[AsyncClient] = None
         self.session: Optional[aiohttp.ClientSession] = None
+        # 会话在进程内共享，请求头随每个请求传入
+        self._headers = {'Accept-Encoding': ACCEPT_ENCODING}
         self.base_url = self.config.get('base_url', 'https://api.binance.com')
+        self.ws_url = self.config.get('ws_url', 'wss://stream.binance.com:9443')
+        self.symbols = tuple(self.config.get('symbols', ['BTCUSDT', 'ETHUSDT']))
+        # 复用simdjson解析器，避免每次请求重新分配解析缓冲区
+        self._json_parser = simdjson.Parser() if simdjson else None
 
-        # 初始化代理管理器
+        # 使用进程内共享的代理管理器，所有请求复用同一个连接池
         settings = get_settings()
-        self.proxy_manager = ProxyManager(settings.proxy_url)
+        self.proxy_manager = get_proxy_manager()
+
+        # 按币安每分钟权重配额的90%限流，预留余量避免突发超限；
+        # 配额按IP计算，多进程时各进程平分，避免合计超限
+        weight_per_minute = int(
+            settings.binance_requests_per_minute * self.RATE_LIMIT_HEADROOM / worker_count()
+        )
+        self._limiter = WeightedTokenBucket(
+            capacity=weight_per_minute,
+            refill_per_s=weight_per_minute / 60
+        )
 
         logger.info(f"Initializing Binance client in {self.mode} mode")
         if settings.proxy_url:
@@ -51,8 +82,8 @@ class BinanceClient:
                 if self.proxy_manager.proxy_url:
                     logger.warning("Proxy is configured but python-binance library doesn't support it yet")
             else:
-                # 公开数据模式：使用带代理的HTTP请求
-                self.session = self.proxy_manager.create_session()
+                # 公开数据模式：使用带代理的共享HTTP会话
+                self.session = await self.proxy_manager.get_session()
                 logger.info("Binance client initialized in public data mode with proxy support")
 
             # 测试连接（非阻塞）
@@ -70,8 +101,8 @@ class BinanceClient:
         try:
             if self.client:
                 await self.client.close_connection()
-            if self.session:
-                await self.session.close()
+            # 共享会话由应用生命周期关闭，这里只释放引用
+            self.session = None
             logger.info("Binance client connections closed")
         except Exception as e:
             logger.error(f"Error closing Binance client: {e}")
@@ -87,19 +118,62 @@ class BinanceClient:
             else:
                 # 测试公开API连接
                 url = f"{self.base_url}/api/v3/ping"
-                async with self.session.get(url) as response:
+                await self._limiter.acquire(1)
+                async with self.session.get(url, headers=self._headers) as response:
+                    self._update_rate_limit(response)
                     if response.status == 200:
                         logger.info("Public API connection test successful")
+                        logger.debug(f"Response Content-Encoding: {response.headers.get('Content-Encoding')}")
                     else:
                         raise Exception(f"Public API test failed with status {response.status}")
         except Exception as e:
             logger.error(f"Connection test failed: {e}")
             raise
 
+    def _update_rate_limit(self, response: aiohttp.ClientResponse):
+        """根据响应头同步限流状态"""
+        used_weight = response.headers.get('X-MBX-USED-WEIGHT-1M')
+        if used_weight:
+            self._limiter.update_used_weight(int(used_weight))
+
+        if response.status in (418, 429):
+            self._limiter.block_for(int(response.headers.get('Retry-After', '1')))
+
+    @staticmethod
+    def _klines_weight(limit: int) -> int:
+        """K线接口请求权重"""
+        if limit < 100:
+            return 1
+        if limit < 500:
+            return 2
+        if limit <= 1000:
+            return 5
+        return 10
+
+    @staticmethod
+    def _depth_weight(limit: int) -> int:
+        """深度接口请求权重"""
+        if limit <= 100:
+            return 5
+        if limit <= 500:
+            return 25
+        if limit <= 1000:
+            return 50
+        return 250
+
+    async def _read_json(self, response: aiohttp.ClientResponse) -> Any:
+        """解析响应JSON（优先使用复用的simdjson解析器，否则使用orjson）"""
+        body = await response.read()
+        if self._json_parser is not None:
+            # recursive=True直接生成Python对象，解析器可安全复用
+            return self._json_parser.parse(body, recursive=True)
+        return orjson.loads(body)
+
     async def get_klines(self, symbol: str, interval: str, limit: int = 500,
                         start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[List]:
         """获取K线数据"""
         try:
+            await self._limiter.acquire(self._klines_weight(limit))
             if self.mode == "FULL_MODE" and self.client:
                 # 使用python-binance客户端
                 klines = await self.client.get_klines(
@@ -123,9 +197,10 @@ class BinanceClient:
                 if end_time:
                     params['endTime'] = end_time
 
-                async with self.session.get(url, params=params) as response:
+                async with self.session.get(url, params=params, headers=self._headers) as response:
+                    self._update_rate_limit(response)
                     if response.status == 200:
-                        data = await response.json()
+                        data = await self._read_json(response)
                         return data
                     else:
                         error_text = await response.text()
@@ -138,6 +213,7 @@ class BinanceClient:
     async def get_ticker_24hr(self, symbol: str) -> Dict:
         """获取24小时价格统计"""
         try:
+            await self._limiter.acquire(2)
             if self.mode == "FULL_MODE" and self.client:
                 ticker = await self.client.get_ticker(symbol=symbol)
                 return ticker
@@ -145,9 +221,10 @@ class BinanceClient:
                 url = f"{self.base_url}/api/v3/ticker/24hr"
                 params = {'symbol': symbol}
 
-                async with self.session.get(url, params=params) as response:
+                async with self.session.get(url, params=params, headers=self._headers) as response:
+                    self._update_rate_limit(response)
                     if response.status == 200:
-                        return await response.json()
+                        return await self._read_json(response)
                     else:
                         error_text = await response.text()
                         raise Exception(f"Ticker request failed: {response.status} - {error_text}")
@@ -159,6 +236,7 @@ class BinanceClient:
     async def get_symbol_ticker(self, symbol: str) -> Dict:
         """获取最新价格"""
         try:
+            await self._limiter.acquire(2)
             if self.mode == "FULL_MODE" and self.client:
                 ticker = await self.client.get_symbol_ticker(symbol=symbol)
                 return ticker
@@ -166,9 +244,10 @@ class BinanceClient:
                 url = f"{self.base_url}/api/v3/ticker/price"
                 params = {'symbol': symbol}
 
-                async with self.session.get(url, params=params) as response:
+                async with self.session.get(url, params=params, headers=self._headers) as response:
+                    self._update_rate_limit(response)
                     if response.status == 200:
-                        return await response.json()
+                        return await self._read_json(response)
                     else:
                         error_text = await response.text()
                         raise Exception(f"Price request failed: {response.status} - {error_text}")
@@ -180,15 +259,17 @@ class BinanceClient:
     async def get_exchange_info(self) -> Dict:
         """获取交易所信息"""
         try:
+            await self._limiter.acquire(20)
             if self.mode == "FULL_MODE" and self.client:
                 info = await self.client.get_exchange_info()
                 return info
             else:
                 url = f"{self.base_url}/api/v3/exchangeInfo"
 
-                async with self.session.get(url) as response:
+                async with self.session.get(url, headers=self._headers) as response:
+                    self._update_rate_limit(response)
                     if response.status == 200:
-                        return await response.json()
+                        return await self._read_json(response)
                     else:
                         error_text = await response.text()
                         raise Exception(f"Exchange info request failed: {response.status} - {error_text}")
@@ -200,6 +281,7 @@ class BinanceClient:
     async def get_orderbook(self, symbol: str, limit: int = 100) -> Dict:
         """获取订单簿深度"""
         try:
+            await self._limiter.acquire(self._depth_weight(limit))
             if self.mode == "FULL_MODE" and self.client:
                 depth = await self.client.get_order_book(symbol=symbol, limit=limit)
                 return depth
@@ -207,9 +289,10 @@ class BinanceClient:
                 url = f"{self.base_url}/api/v3/depth"
                 params = {'symbol': symbol, 'limit': limit}
 
-                async with self.session.get(url, params=params) as response:
+                async with self.session.get(url, params=params, headers=self._headers) as response:
+                    self._update_rate_limit(response)
                     if response.status == 200:
-                        return await response.json()
+                        return await self._read_json(response)
                     else:
                         error_text = await response.text()
                         raise Exception(f"Orderbook request failed: {response.status} - {error_text}")
@@ -266,15 +349,41 @@ class BinanceClient:
                 all_klines.extend(klines)
                 current_time = klines[-1][6] + 1  # 下一批从最后一个K线的结束时间+1开始
 
-                # 避免请求频率过高
-                await asyncio.sleep(0.1)
-
             except Exception as e:
                 logger.error(f"Error fetching historical data batch: {e}")
                 break
 
         return all_klines
 
+    async def stream_klines(self, symbols: Sequence[str], interval: str) -> AsyncIterator[Dict]:
+        """订阅多个交易对的K线推送（组合流），逐条产出kline事件"""
+        streams = [f"{symbol.lower()}@kline_{interval}" for symbol in symbols]
+
+        if self.mode == "FULL_MODE" and self.client:
+            # 使用python-binance的WebSocket管理器
+            socket_manager = BinanceSocketManager(self.client)
+            async with socket_manager.multiplex_socket(streams) as socket:
+                logger.info(f"Kline stream connected: {len(streams)} streams")
+                while True:
+                    payload = await socket.recv()
+                    if payload.get('e') == 'error':
+                        raise Exception(f"Kline stream error: {payload.get('m')}")
+                    kline = payload.get('data', {}).get('k')
+                    if kline:
+                        yield kline
+        else:
+            # 公开模式：单个连接订阅所有交易对
+            url = f"{self.ws_url}/stream?streams={'/'.join(streams)}"
+            async with self.session.ws_connect(url, heartbeat=60) as ws:
+                logger.info(f"Kline stream connected: {len(streams)} streams")
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        kline = orjson.loads(msg.data).get('data', {}).get('k')
+                        if kline:
+                            yield kline
+                    elif msg.type == aiohttp.WSMsgType.ERROR:
+                        raise Exception(f"Kline stream error: {ws.exception()}")
+
     def _get_interval_ms(self, interval: str) -> int:
         """获取时间间隔对应的毫秒数"""
         interval_map = {
@@ -300,6 +409,6 @@ class BinanceClient:
         """是否为完整功能模式"""
         return self.mode == "FULL_MODE"
 
-    def get_supported_symbols(self) -> List[str]:
+    def get_supported_symbols(self) -> Tuple[str, ...]:
         """获取支持的交易对列表"""
-        return self.config.get('symbols', ['BTCUSDT', 'ETHUSDT'])
+        return self.symbols
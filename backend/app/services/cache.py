@@ -0,0 +1,175 @@
+"""
+缓存服务
+基于Redis的stale-while-revalidate缓存，Redis不可用时退回进程内缓存
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import orjson
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # redis为可选依赖
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+class SWRCache:
+    """stale-while-revalidate缓存"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url
+        self._redis = None
+        self._redis_disabled = aioredis is None or not redis_url
+        # 进程内备用缓存 {key: (过期时间, 数据)}
+        self._local: Dict[str, Tuple[float, bytes]] = {}
+        # 进程内备用缓存的分组 {group: {key}}
+        self._local_groups: Dict[str, Set[str]] = {}
+        # 正在后台刷新的key，避免重复刷新
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _get_redis(self):
+        """获取Redis连接（不可用时返回None）"""
+        if self._redis_disabled:
+            return None
+
+        if self._redis is None:
+            try:
+                self._redis = aioredis.from_url(self.redis_url)
+                await self._redis.ping()
+            except Exception as e:
+                logger.warning(f"Redis unavailable, falling back to in-process cache: {e}")
+                self._redis = None
+                self._redis_disabled = True
+
+        return self._redis
+
+    async def _load(self, key: str) -> Optional[bytes]:
+        """读取缓存原始数据"""
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                return await redis.get(key)
+            except Exception as e:
+                logger.warning(f"Redis get failed for {key}: {e}")
+                return None
+
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._local.pop(key, None)
+            return None
+        return entry[1]
+
+    @staticmethod
+    def _group_key(group: str) -> str:
+        """记录分组成员的Redis集合键"""
+        return f"group:{group}"
+
+    async def _store(self, key: str, data: bytes, expire: int, group: Optional[str] = None):
+        """写入缓存原始数据（指定group时记录到分组，供invalidate_group按组删除）"""
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                if group is None:
+                    await redis.set(key, data, ex=expire)
+                else:
+                    group_key = self._group_key(group)
+                    async with redis.pipeline(transaction=False) as pipe:
+                        pipe.set(key, data, ex=expire)
+                        pipe.sadd(group_key, key)
+                        # 集合本身也设置过期，成员全部过期后不会残留
+                        pipe.expire(group_key, expire)
+                        await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Redis set failed for {key}: {e}")
+            return
+
+        self._local[key] = (time.monotonic() + expire, data)
+        if group is not None:
+            self._local_groups.setdefault(group, set()).add(key)
+
+    async def set(self, key: str, value: Any, stale_ttl: int,
+                  serialize: Callable[[Any], Any] = lambda v: v, group: Optional[str] = None):
+        """写入缓存（记录写入时间用于判断新鲜度）"""
+        envelope = {'t': time.time(), 'v': serialize(value)}
+        await self._store(key, orjson.dumps(envelope), stale_ttl, group)
+
+    async def get_or_set_swr(self, key: str, factory: Callable[[], Awaitable[Any]],
+                             ttl: int, stale_ttl: int,
+                             serialize: Callable[[Any], Any] = lambda v: v,
+                             deserialize: Callable[[Any], Any] = lambda v: v,
+                             group: Optional[str] = None) -> Any:
+        """
+        获取缓存，过期但未失效时先返回旧值并在后台刷新
+
+        Args:
+            key: 缓存键
+            factory: 生成新值的协程函数
+            ttl: 新鲜期（秒）
+            stale_ttl: 失效期（秒），超过后必须同步重新生成
+            serialize: 值转换为可JSON序列化对象
+            deserialize: 从JSON对象还原值
+            group: 缓存分组，同组的缓存可由invalidate_group一次删除
+
+        Returns:
+            缓存值或新生成的值
+        """
+        raw = await self._load(key)
+        if raw is not None:
+            envelope = orjson.loads(raw)
+            if time.time() - envelope['t'] >= ttl:
+                self._schedule_refresh(key, factory, stale_ttl, serialize, group)
+            return deserialize(envelope['v'])
+
+        value = await factory()
+        await self.set(key, value, stale_ttl, serialize, group)
+        return value
+
+    def _schedule_refresh(self, key: str, factory: Callable[[], Awaitable[Any]],
+                          stale_ttl: int, serialize: Callable[[Any], Any],
+                          group: Optional[str] = None):
+        """在后台刷新缓存"""
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                value = await factory()
+                await self.set(key, value, stale_ttl, serialize, group)
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def invalidate_group(self, group: str):
+        """删除分组内的所有缓存（只访问该组记录的键，不扫描整个键空间）"""
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                group_key = self._group_key(group)
+                keys = await redis.smembers(group_key)
+                await redis.delete(group_key, *keys)
+            except Exception as e:
+                logger.warning(f"Redis invalidation failed for {group}: {e}")
+            return
+
+        for key in self._local_groups.pop(group, ()):
+            self._local.pop(key, None)
+
+    async def close(self):
+        """关闭缓存连接"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
@@ -5,29 +5,65 @@
 
 import asyncio
 import logging
+import time
+import numpy as np
+from operator import attrgetter
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from sqlalchemy import select, and_
+from typing import List, Dict, Optional, Tuple
+from decimal import Decimal
+from sqlalchemy import select, and_, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
+from ..core.database import get_session_maker
 from ..core.config import get_settings
 from ..models.kline import KLine
-from ..schemas.market import KLineData
+from ..schemas.market import KLineData, KLineFrame
 from .binance_client import BinanceClient
+from .cache import SWRCache
+from ..utils.ticker import ticker
 
 logger = logging.getLogger(__name__)
 
+# 支持的K线时间间隔
+_INTERVALS = ('1m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d', '3d', '1w')
+
+# REST轮询在定时循环中的任务名和间隔（秒），4小时K线每5分钟更新一次
+POLLING_JOB = 'market_polling'
+POLLING_INTERVAL = 300
+
+# 与KLineData字段顺序一致的K线表列，查询直接返回元组行
+_KLINE_COLUMNS = attrgetter(*KLineData.__fields__)(KLine)
+
 class MarketDataService:
     """市场数据服务"""
 
+    # 超过该行数的历史数据在PostgreSQL上改用COPY写入
+    COPY_MIN_ROWS = 100
+
+    # K线缓存的新鲜期/失效期（秒），未列出的周期使用默认值
+    KLINE_CACHE_TTL = {
+        '1m': (60, 300),
+        '5m': (60, 300),
+    }
+    DEFAULT_KLINE_CACHE_TTL = (300, 900)
+    # 市场概览的新鲜期/失效期（秒）
+    MARKET_OVERVIEW_CACHE_TTL = (300, 3600)
+
     def __init__(self):
         self.settings = get_settings()
         self.binance_client: Optional[BinanceClient] = None
-        self.symbols = self.settings.binance_symbols
+        self.symbols = tuple(self.settings.binance_symbols)
         self.default_interval = self.settings.binance_default_interval
         self._real_time_tasks = {}
+        # 轮询时每个交易对最后一根已收盘K线的收盘时间
+        self._last_close_time: Dict[str, int] = {}
         self._is_running = False
+        self.cache = SWRCache(self.settings.redis_url)
+        # 限制同时发往币安的K线请求数
+        self._request_sem = asyncio.Semaphore(self.settings.binance_max_concurrency or 8)
 
     async def initialize(self):
         """初始化服务"""
@@ -50,17 +86,21 @@ class MarketDataService:
             for task in self._real_time_tasks.values():
                 if not task.done():
                     task.cancel()
+            self._stop_polling_fallback()
 
             if self.binance_client:
                 await self.binance_client.close()
 
+            await self.cache.close()
+
             logger.info("Market data service closed")
         except Exception as e:
             logger.error(f"Error closing market data service: {e}")
 
     async def get_klines(self, symbol: str, interval: str, limit: int = 500,
                         start_time: Optional[int] = None, end_time: Optional[int] = None,
-                        use_cache: bool = True) -> List[KLineData]:
+                        use_cache: bool = True, before_open_time: Optional[int] = None,
+                        fallback_to_mock: bool = True) -> List[KLineData]:
         """
         获取K线数据（优先从缓存获取）
 
@@ -71,69 +111,116 @@ class MarketDataService:
             start_time: 开始时间戳
             end_time: 结束时间戳
             use_cache: 是否使用缓存
+            before_open_time: 翻页游标，只返回开盘时间早于该值的数据
+            fallback_to_mock: 获取失败时是否返回模拟数据；为False时抛出异常
 
         Returns:
             K线数据列表
         """
         try:
-            klines = []
-
-            if use_cache:
-                # 首先尝试从数据库获取缓存数据
-                klines = await self._get_klines_from_db(symbol, interval, limit, start_time, end_time)
-
-            # 如果缓存数据不足，从API获取
-            if not klines or len(klines) < limit:
-                logger.info(f"Fetching {symbol} {interval} data from API (cache insufficient)")
-                klines = await self._get_klines_from_api(symbol, interval, limit, start_time, end_time)
-
-                # 保存到数据库
-                if klines:
-                    await self._save_klines_to_db(klines, symbol, interval)
+            if before_open_time is not None:
+                # 键集分页：open_time < 游标，走索引定位而非OFFSET
+                end_time = before_open_time - 1 if end_time is None else min(end_time, before_open_time - 1)
+
+            if use_cache and start_time is None and end_time is None:
+                ttl, stale_ttl = self.KLINE_CACHE_TTL.get(interval, self.DEFAULT_KLINE_CACHE_TTL)
+                klines = await self.cache.get_or_set_swr(
+                    f"kline:{symbol}:{interval}:{limit}",
+                    lambda: self._load_klines(symbol, interval, limit),
+                    ttl, stale_ttl,
+                    serialize=lambda rows: [vars(row) for row in rows],
+                    deserialize=lambda rows: [KLineData.construct(**row) for row in rows],
+                    group=f"kline:{symbol}:{interval}"
+                )
+            else:
+                klines = await self._load_klines(symbol, interval, limit, start_time, end_time, use_cache)
 
             logger.info(f"Retrieved {len(klines)} klines for {symbol} {interval}")
             return klines
 
         except Exception as e:
             logger.error(f"Error getting klines for {symbol}: {e}")
+            if not fallback_to_mock:
+                raise
             logger.warning(f"Returning mock kline data for {symbol}")
             return self._get_mock_klines(symbol, interval, limit)
 
-    async def _get_klines_from_db(self, symbol: str, interval: str, limit: int,
-                                 start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[KLineData]:
-        """从数据库获取K线数据"""
+    async def _load_klines(self, symbol: str, interval: str, limit: int,
+                           start_time: Optional[int] = None, end_time: Optional[int] = None,
+                           use_cache: bool = True) -> List[KLineData]:
+        """从数据库或API加载K线数据（失败时抛出异常）"""
+        # 先计数判断缓存是否足够，足够时才加载并转换数据库行
+        if use_cache and await self._count_klines_in_db(symbol, interval, limit, start_time, end_time) >= limit:
+            klines = await self._fetch_klines_from_db(symbol, interval, limit, start_time, end_time)
+            if klines:
+                return klines
+
+        # 缓存数据不足，从API获取
+        logger.info(f"Fetching {symbol} {interval} data from API (cache insufficient)")
+        frame = await self._get_klines_from_api(symbol, interval, limit, start_time, end_time)
+
+        # 保存到数据库
+        if len(frame):
+            await self._save_klines_to_db(frame, symbol, interval)
+        return frame.rows()
+
+    @staticmethod
+    def _kline_conditions(symbol: str, interval: str,
+                          start_time: Optional[int] = None, end_time: Optional[int] = None) -> list:
+        """构建K线查询条件"""
+        conditions = [
+            KLine.symbol == symbol,
+            KLine.timeframe == interval
+        ]
+        if start_time:
+            conditions.append(KLine.open_time >= start_time)
+        if end_time:
+            conditions.append(KLine.open_time <= end_time)
+        return conditions
+
+    async def _count_klines_in_db(self, symbol: str, interval: str, limit: int,
+                                  start_time: Optional[int] = None, end_time: Optional[int] = None) -> int:
+        """统计数据库中可用的K线条数（最多统计limit条）"""
         try:
-            async for session in get_db():
-                query = select(KLine).where(
-                    and_(
-                        KLine.symbol == symbol,
-                        KLine.timeframe == interval
-                    )
-                )
+            session_maker = await get_session_maker()
+            async with session_maker() as session:
+                conditions = self._kline_conditions(symbol, interval, start_time, end_time)
+                window = select(KLine.id).where(and_(*conditions)).limit(limit).subquery()
+                return await session.scalar(select(func.count()).select_from(window))
 
-                if start_time:
-                    query = query.where(KLine.open_time >= start_time)
-                if end_time:
-                    query = query.where(KLine.open_time <= end_time)
+        except Exception as e:
+            logger.error(f"Error counting klines in database: {e}")
+            return 0
 
-                query = query.order_by(KLine.open_time.desc()).limit(limit)
+    async def _fetch_klines_from_db(self, symbol: str, interval: str, limit: int,
+                                    start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[KLineData]:
+        """从数据库获取K线数据"""
+        try:
+            session_maker = await get_session_maker()
+            async with session_maker() as session:
+                conditions = self._kline_conditions(symbol, interval, start_time, end_time)
+                # 子查询按倒序取最近limit条，外层再按正序返回，无需在Python中反转
+                latest = select(*_KLINE_COLUMNS).where(and_(*conditions))
+                latest = latest.order_by(KLine.open_time.desc()).limit(limit).subquery()
+                query = select(latest).order_by(latest.c.open_time.asc())
                 result = await session.execute(query)
-                klines = result.scalars().all()
-
-                # 转换为KLineData格式
-                data = []
-                for kline in reversed(klines):  # 反转以获得正确的时间顺序
-                    data.append(KLineData(
-                        symbol=kline.symbol,
-                        timeframe=kline.timeframe,
-                        open_time=kline.open_time,
-                        close_time=kline.close_time,
-                        open_price=float(kline.open_price),
-                        high_price=float(kline.high_price),
-                        low_price=float(kline.low_price),
-                        close_price=float(kline.close_price),
-                        volume=float(kline.volume)
-                    ))
+
+                # 转换为KLineData格式（数据库数据可信，跳过校验）
+                data = [
+                    KLineData.construct(
+                        symbol=row_symbol,
+                        timeframe=timeframe,
+                        open_time=open_time,
+                        close_time=close_time,
+                        open_price=float(open_price),
+                        high_price=float(high_price),
+                        low_price=float(low_price),
+                        close_price=float(close_price),
+                        volume=float(volume)
+                    )
+                    for row_symbol, timeframe, open_time, close_time,
+                        open_price, high_price, low_price, close_price, volume in result
+                ]
 
                 logger.debug(f"Retrieved {len(data)} klines from database")
                 return data
@@ -143,77 +230,123 @@ class MarketDataService:
             return []
 
     async def _get_klines_from_api(self, symbol: str, interval: str, limit: int,
-                                  start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[KLineData]:
+                                  start_time: Optional[int] = None, end_time: Optional[int] = None) -> KLineFrame:
         """从API获取K线数据"""
         try:
             if not self.binance_client:
                 raise Exception("Binance client not initialized")
 
-            raw_klines = await self.binance_client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit,
-                start_time=start_time,
-                end_time=end_time
-            )
-
-            # 转换为KLineData格式
-            data = []
-            for kline in raw_klines:
-                data.append(KLineData(
+            async with self._request_sem:
+                raw_klines = await self.binance_client.get_klines(
                     symbol=symbol,
-                    timeframe=interval,
-                    open_time=int(kline[0]),
-                    close_time=int(kline[6]),
-                    open_price=float(kline[1]),
-                    high_price=float(kline[2]),
-                    low_price=float(kline[3]),
-                    close_price=float(kline[4]),
-                    volume=float(kline[5])
-                ))
-
-            logger.debug(f"Retrieved {len(data)} klines from API")
-            return data
+                    interval=interval,
+                    limit=limit,
+                    start_time=start_time,
+                    end_time=end_time
+                )
+
+            # 直接构建列式数据
+            frame = KLineFrame.from_binance(symbol, interval, raw_klines)
+
+            logger.debug(f"Retrieved {len(frame)} klines from API")
+            return frame
 
         except Exception as e:
             logger.error(f"Error getting klines from API: {e}")
             raise e  # 重新抛出异常，让上层处理
 
-    async def _save_klines_to_db(self, klines: List[KLineData], symbol: str, interval: str):
-        """保存K线数据到数据库"""
+    @staticmethod
+    def _kline_insert_stmt(dialect_name: str, values: List[Dict]):
+        """构建忽略重复行的批量插入语句（按数据库方言分派）"""
+        if dialect_name == 'mysql':
+            return mysql_insert(KLine).values(values).prefix_with('IGNORE')
+
+        insert = pg_insert if dialect_name == 'postgresql' else sqlite_insert
+        return insert(KLine).values(values).on_conflict_do_nothing(
+            index_elements=['symbol', 'timeframe', 'open_time']
+        )
+
+    async def _copy_klines_to_db(self, session: AsyncSession, values: List[Dict]):
+        """PostgreSQL(asyncpg)下通过COPY写入临时表，再合并到K线表"""
+        columns = list(values[0].keys())
+        column_list = ', '.join(columns)
+
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        asyncpg_conn = raw_connection.driver_connection
+
+        await asyncpg_conn.execute(
+            f"CREATE TEMP TABLE klines_staging ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {KLine.__tablename__} WITH NO DATA"
+        )
+        await asyncpg_conn.copy_records_to_table(
+            'klines_staging',
+            records=[tuple(row.values()) for row in values],
+            columns=columns
+        )
+        await asyncpg_conn.execute(
+            f"INSERT INTO {KLine.__tablename__} ({column_list}, created_at) "
+            f"SELECT {column_list}, now() FROM klines_staging "
+            f"ON CONFLICT (symbol, timeframe, open_time) DO NOTHING"
+        )
+
+    async def _write_klines(self, session: AsyncSession, values: List[Dict], use_copy: bool = False):
+        """在调用方的事务中写入K线行"""
+        dialect = session.bind.dialect
+        if use_copy and dialect.driver == 'asyncpg' and len(values) > self.COPY_MIN_ROWS:
+            await self._copy_klines_to_db(session, values)
+            return
+
+        # 分批UPSERT，已存在的K线直接跳过
+        batch_size = self.settings.db_batch_size
+        for i in range(0, len(values), batch_size):
+            stmt = self._kline_insert_stmt(dialect.name, values[i:i + batch_size])
+            await session.execute(stmt)
+
+    async def _save_klines_to_db(self, frame: KLineFrame, symbol: str, interval: str,
+                                 use_copy: bool = False, session: Optional[AsyncSession] = None):
+        """
+        保存K线数据到数据库
+
+        Args:
+            frame: K线列式数据
+            symbol: 交易对符号
+            interval: 时间间隔
+            use_copy: 大批量时允许使用COPY快速写入
+            session: 可选的外部会话，由调用方负责提交（便于多个交易对共用一个事务）
+        """
         try:
-            async for session in get_db():
-                for kline_data in klines:
-                    # 检查是否已存在
-                    existing = await session.execute(
-                        select(KLine).where(
-                            and_(
-                                KLine.symbol == symbol,
-                                KLine.timeframe == interval,
-                                KLine.open_time == kline_data.open_time
-                            )
-                        )
-                    )
+            if not len(frame):
+                return
+
+            values = [
+                {
+                    'symbol': symbol,
+                    'timeframe': interval,
+                    'open_time': open_time,
+                    'close_time': close_time,
+                    'open_price': Decimal(str(open_price)),
+                    'high_price': Decimal(str(high_price)),
+                    'low_price': Decimal(str(low_price)),
+                    'close_price': Decimal(str(close_price)),
+                    'volume': Decimal(str(volume))
+                }
+                for open_time, close_time, open_price, high_price, low_price, close_price, volume
+                in frame.columns()
+            ]
+
+            if session is not None:
+                await self._write_klines(session, values, use_copy)
+            else:
+                session_maker = await get_session_maker()
+                async with session_maker() as session:
+                    async with session.begin():
+                        await self._write_klines(session, values, use_copy)
+
+            # 数据已更新，使该交易对周期的K线缓存失效
+            await self.cache.invalidate_group(f"kline:{symbol}:{interval}")
 
-                    if not existing.scalar():
-                        # 创建新记录
-                        kline = KLine.from_binance_kline(
-                            symbol=symbol,
-                            timeframe=interval,
-                            kline_data=[
-                                kline_data.open_time,
-                                str(kline_data.open_price),
-                                str(kline_data.high_price),
-                                str(kline_data.low_price),
-                                str(kline_data.close_price),
-                                str(kline_data.volume),
-                                kline_data.close_time
-                            ]
-                        )
-                        session.add(kline)
-
-                await session.commit()
-                logger.debug(f"Saved {len(klines)} klines to database")
+            logger.debug(f"Saved {len(frame)} klines to database")
 
         except Exception as e:
             logger.error(f"Error saving klines to database: {e}")
@@ -232,8 +365,8 @@ class MarketDataService:
         """
         try:
             # 计算时间范围
-            end_time = int(datetime.now().timestamp() * 1000)
-            start_time = int((datetime.now() - timedelta(days=days)).timestamp() * 1000)
+            end_time = time.time_ns() // 1_000_000
+            start_time = end_time - days * 86_400_000
 
             # 获取大量历史数据
             if not self.binance_client:
@@ -260,26 +393,14 @@ class MarketDataService:
                     end_time=end_time
                 )
 
-            # 转换数据格式
-            klines = []
-            for kline in raw_klines:
-                klines.append(KLineData(
-                    symbol=symbol,
-                    timeframe=interval,
-                    open_time=int(kline[0]),
-                    close_time=int(kline[6]),
-                    open_price=float(kline[1]),
-                    high_price=float(kline[2]),
-                    low_price=float(kline[3]),
-                    close_price=float(kline[4]),
-                    volume=float(kline[5])
-                ))
+            # 转换为列式数据
+            frame = KLineFrame.from_binance(symbol, interval, raw_klines)
 
             # 保存到数据库
-            await self._save_klines_to_db(klines, symbol, interval)
+            await self._save_klines_to_db(frame, symbol, interval, use_copy=True)
 
-            logger.info(f"Retrieved {len(klines)} historical klines for {symbol}")
-            return klines
+            logger.info(f"Retrieved {len(frame)} historical klines for {symbol}")
+            return frame.rows()
 
         except Exception as e:
             logger.error(f"Error getting historical data for {symbol}: {e}")
@@ -292,13 +413,16 @@ class MarketDataService:
                 logger.warning(f"Binance client not available, returning mock data for {symbol}")
                 return self._get_mock_ticker(symbol)
 
-            ticker_24hr = await self.binance_client.get_ticker_24hr(symbol)
-            current_price = await self.binance_client.get_symbol_ticker(symbol)
+            # 两个请求互不依赖，并发执行
+            ticker_24hr, current_price = await asyncio.gather(
+                self.binance_client.get_ticker_24hr(symbol),
+                self.binance_client.get_symbol_ticker(symbol)
+            )
 
             # 合并数据
             result = ticker_24hr.copy()
             result['current_price'] = float(current_price.get('price', 0))
-            result['timestamp'] = int(datetime.now().timestamp() * 1000)
+            result['timestamp'] = time.time_ns() // 1_000_000
 
             return result
 
@@ -308,25 +432,12 @@ class MarketDataService:
             return self._get_mock_ticker(symbol)
 
     async def get_market_overview(self) -> Dict:
-        """获取市场概览"""
+        """获取市场概览（交易所信息变化很少，缓存5分钟）"""
         try:
-            if not self.binance_client:
-                raise Exception("Binance client not initialized")
-
-            exchange_info = await self.binance_client.get_exchange_info()
-            symbols_info = exchange_info.get('symbols', [])
-
-            # 统计活跃交易对
-            active_symbols = [s['symbol'] for s in symbols_info if s['status'] == 'TRADING']
-            supported_symbols = self.binance_client.get_supported_symbols()
-
-            return {
-                'total_symbols': len(symbols_info),
-                'active_symbols': len(active_symbols),
-                'supported_symbols': supported_symbols,
-                'api_mode': 'FULL_MODE' if self.binance_client.is_full_mode() else 'PUBLIC_MODE',
-                'last_update': datetime.now()
-            }
+            return await self.cache.get_or_set_swr(
+                "market:overview", self._load_market_overview,
+                *self.MARKET_OVERVIEW_CACHE_TTL
+            )
 
         except Exception as e:
             logger.error(f"Error getting market overview: {e}")
@@ -338,6 +449,26 @@ class MarketDataService:
                 'last_update': datetime.now()
             }
 
+    async def _load_market_overview(self) -> Dict:
+        """从交易所信息统计市场概览（失败时抛出异常）"""
+        if not self.binance_client:
+            raise Exception("Binance client not initialized")
+
+        exchange_info = await self.binance_client.get_exchange_info()
+        symbols_info = exchange_info.get('symbols', [])
+
+        # 统计活跃交易对
+        active_count = sum(1 for s in symbols_info if s['status'] == 'TRADING')
+        supported_symbols = self.binance_client.get_supported_symbols()
+
+        return {
+            'total_symbols': len(symbols_info),
+            'active_symbols': active_count,
+            'supported_symbols': supported_symbols,
+            'api_mode': 'FULL_MODE' if self.binance_client.is_full_mode() else 'PUBLIC_MODE',
+            'last_update': datetime.now()
+        }
+
     async def start_real_time_data(self):
         """启动实时数据更新"""
         try:
@@ -346,52 +477,103 @@ class MarketDataService:
 
             self._is_running = True
 
-            # 为每个支持的交易对启动数据更新任务
-            for symbol in self.symbols:
-                task = asyncio.create_task(
-                    self._update_symbol_data_periodically(symbol)
-                )
-                self._real_time_tasks[symbol] = task
+            if self.binance_client:
+                # 使用单个WebSocket连接接收所有交易对的K线推送
+                self._real_time_tasks['stream'] = asyncio.create_task(self._consume_kline_stream())
+            else:
+                self._start_polling_fallback()
 
             logger.info(f"Started real-time data updates for {len(self.symbols)} symbols")
 
         except Exception as e:
             logger.error(f"Error starting real-time data: {e}")
 
-    async def _update_symbol_data_periodically(self, symbol: str):
-        """定期更新单个交易对的数据"""
+    async def _consume_kline_stream(self):
+        """消费K线推送，推送不可用时退回REST轮询"""
+        retry_delay = 5
         try:
             while self._is_running:
                 try:
-                    # 获取最新的K线数据
-                    latest_klines = await self.get_klines(
-                        symbol=symbol,
-                        interval=self.default_interval,
-                        limit=10,
+                    async for kline in self.binance_client.stream_klines(self.symbols, self.default_interval):
+                        # 推送已恢复，停止轮询
+                        self._stop_polling_fallback()
+                        retry_delay = 5
+
+                        if kline.get('x'):  # 仅处理已收盘的K线
+                            await self._save_stream_kline(kline)
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Kline stream unavailable, falling back to REST polling: {e}")
+
+                self._start_polling_fallback()
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 300)
+
+        except asyncio.CancelledError:
+            logger.info("Kline stream cancelled")
+
+    async def _save_stream_kline(self, kline: Dict):
+        """保存推送的已收盘K线"""
+        symbol = kline['s']
+        interval = kline['i']
+        frame = KLineFrame.from_binance(symbol, interval, [
+            [kline['t'], kline['o'], kline['h'], kline['l'], kline['c'], kline['v'], kline['T']]
+        ])
+        await self._save_klines_to_db(frame, symbol, interval)
+        logger.debug(f"Stream updated {symbol} data: close price {kline['c']}")
+
+    def _start_polling_fallback(self):
+        """在全局定时循环中注册REST轮询（推送不可用时的备用方案），注册后立即执行一次"""
+        if not ticker.is_registered(POLLING_JOB):
+            ticker.register(POLLING_JOB, self._poll_symbols, every=POLLING_INTERVAL)
+            ticker.start()
+
+    def _stop_polling_fallback(self):
+        """停止REST轮询"""
+        ticker.unregister(POLLING_JOB)
+
+    async def _poll_symbols(self):
+        """轮询一次所有交易对的数据，由定时循环每POLLING_INTERVAL秒调用"""
+        try:
+            for symbol in self.symbols:
+                try:
+                    # 只请求上次已收盘K线之后的数据（保存时会使缓存失效）
+                    # 直接走API加载路径：请求失败时抛出异常而不是返回模拟数据，
+                    # 避免模拟K线的收盘时间被记为已同步位置
+                    last_close_time = self._last_close_time.get(symbol)
+                    latest_klines = await self._load_klines(
+                        symbol,
+                        self.default_interval,
+                        limit=10 if last_close_time is None else 5,
+                        start_time=None if last_close_time is None else last_close_time + 1,
                         use_cache=False
                     )
 
                     if latest_klines:
+                        now_ms = time.time_ns() // 1_000_000
+                        closed = [k.close_time for k in latest_klines if k.close_time < now_ms]
+                        if closed:
+                            self._last_close_time[symbol] = closed[-1]
                         logger.debug(f"Updated {symbol} data: latest price {latest_klines[-1].close_price}")
 
                 except Exception as e:
                     logger.error(f"Error updating {symbol} data: {e}")
 
-                # 等待下次更新（4小时K线，每5分钟更新一次）
-                await asyncio.sleep(300)  # 5分钟
-
         except asyncio.CancelledError:
-            logger.info(f"Real-time data update for {symbol} cancelled")
+            logger.info("Real-time data polling cancelled")
+            raise
         except Exception as e:
-            logger.error(f"Error in real-time data update for {symbol}: {e}")
+            logger.error(f"Error in real-time data polling: {e}")
 
-    def get_supported_symbols(self) -> List[str]:
+    def get_supported_symbols(self) -> Tuple[str, ...]:
         """获取支持的交易对列表"""
-        return self.symbols.copy()
+        return self.symbols
 
-    def get_supported_intervals(self) -> List[str]:
+    def get_supported_intervals(self) -> Tuple[str, ...]:
         """获取支持的时间间隔"""
-        return ['1m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d', '3d', '1w']
+        return _INTERVALS
 
     def _get_mock_ticker(self, symbol: str) -> Dict:
         """生成模拟价格数据"""
@@ -423,6 +605,7 @@ class MarketDataService:
         # 生成成交量
         volume = random.uniform(1000, 10000)
         quote_volume = volume * current_price
+        now_ms = time.time_ns() // 1_000_000
         
         return {
             'symbol': symbol.upper(),
@@ -440,18 +623,16 @@ class MarketDataService:
             'low_price': f"{low_price:.2f}",
             'volume': f"{volume:.2f}",
             'quote_volume': f"{quote_volume:.2f}",
-            'open_time': int((datetime.now() - timedelta(hours=24)).timestamp() * 1000),
-            'close_time': int(datetime.now().timestamp() * 1000),
+            'open_time': now_ms - 86_400_000,
+            'close_time': now_ms,
             'first_id': random.randint(1000000, 9999999),
             'last_id': random.randint(1000000, 9999999),
             'count': random.randint(1000, 10000),
-            'timestamp': int(datetime.now().timestamp() * 1000)
+            'timestamp': now_ms
         }
 
     def _get_mock_klines(self, symbol: str, interval: str, limit: int) -> List[KLineData]:
         """生成模拟K线数据"""
-        import random
-        
         # 基础价格
         base_prices = {
             'BTCUSDT': 45000.0,
@@ -471,41 +652,34 @@ class MarketDataService:
         }
         
         minutes = interval_minutes.get(interval, 240)  # 默认4小时
+        interval_ms = minutes * 60 * 1000
+        rng = np.random.default_rng()
         
-        klines = []
-        current_time = datetime.now()
-        current_price = base_price
+        # 计算时间
+        now_ms = time.time_ns() // 1_000_000
+        open_time = now_ms - interval_ms * (limit - np.arange(limit, dtype=np.int64))
+        close_time = open_time + interval_ms
         
-        for i in range(limit):
-            # 计算时间
-            open_time = current_time - timedelta(minutes=minutes * (limit - i))
-            close_time = open_time + timedelta(minutes=minutes)
-            
-            # 生成价格数据
-            price_change = random.uniform(-0.02, 0.02)  # ±2% 变化
-            open_price = current_price
-            close_price = open_price * (1 + price_change)
-            
-            # 生成高低价
-            high_price = max(open_price, close_price) * (1 + random.uniform(0, 0.01))
-            low_price = min(open_price, close_price) * (1 - random.uniform(0, 0.01))
-            
-            # 生成成交量
-            volume = random.uniform(100, 1000)
-            
-            kline = KLineData(
-                symbol=symbol.upper(),
-                timeframe=interval,
-                open_time=int(open_time.timestamp() * 1000),
-                close_time=int(close_time.timestamp() * 1000),
-                open_price=round(open_price, 2),
-                high_price=round(high_price, 2),
-                low_price=round(low_price, 2),
-                close_price=round(close_price, 2),
-                volume=round(volume, 2)
-            )
-            
-            klines.append(kline)
-            current_price = close_price
+        # 生成价格数据（±2% 随机游走）
+        close_price = base_price * np.cumprod(1 + rng.uniform(-0.02, 0.02, limit))
+        open_price = np.concatenate(([base_price], close_price[:-1]))
+        
+        # 生成高低价
+        high_price = np.maximum(open_price, close_price) * (1 + rng.uniform(0, 0.01, limit))
+        low_price = np.minimum(open_price, close_price) * (1 - rng.uniform(0, 0.01, limit))
+        
+        # 生成成交量
+        volume = rng.uniform(100, 1000, limit)
         
-        return klines
+        frame = KLineFrame(
+            symbol=symbol.upper(),
+            timeframe=interval,
+            open_time=open_time,
+            close_time=close_time,
+            open=np.round(open_price, 2),
+            high=np.round(high_price, 2),
+            low=np.round(low_price, 2),
+            close=np.round(close_price, 2),
+            volume=np.round(volume, 2)
+        )
+        return frame.rows()
@@ -5,7 +5,10 @@
 
 import asyncio
 import logging
-from typing import List, Dict, Optional, Any
+import time
+from collections import OrderedDict
+import numpy as np
+from typing import List, Dict, Optional, Any, Tuple, Literal, Union
 from datetime import datetime
 
 from ..core.config import get_settings
@@ -16,14 +19,42 @@ from ..services.market_data import MarketDataService
 
 logger = logging.getLogger(__name__)
 
+# analyze_symbol返回的指标明细级别
+DetailLevel = Literal["full", "latest", "signals_only"]
+
+_analysis_time_cache = (0, "")
+
+def _analysis_time() -> str:
+    """当前时间的ISO字符串（按秒缓存，仅用于展示）"""
+    global _analysis_time_cache
+    second = int(time.time())
+    if _analysis_time_cache[0] != second:
+        _analysis_time_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _analysis_time_cache[1]
+
 class StrategyEngine:
     """策略引擎"""
     
+    # 增量更新指标时获取的K线条数
+    INCREMENTAL_FETCH_LIMIT = 5
+    # 保留的增量指标状态数（按最近使用淘汰）
+    INCREMENTAL_STATE_SIZE = 256
+    # 批量分析时同时进行的分析数
+    BATCH_CONCURRENCY = 8
+    # 批量分析每个交易对使用的K线条数
+    BATCH_KLINE_LIMIT = 100
+    
     def __init__(self):
         self.settings = get_settings()
         self.indicator_engine = TechnicalIndicatorEngine()
         self.market_service: Optional[MarketDataService] = None
         self.default_config = self._create_default_config()
+        # 默认配置对应的指标参数只需构建一次
+        self._default_indicator_config = self._indicator_config(self.default_config)
+        # 进行中的分析任务，相同参数的并发请求共用一个结果
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # 增量指标状态 {(symbol, timeframe, 指标参数): 已收盘K线的递推状态}，LRU淘汰
+        self._state: "OrderedDict[Tuple, Dict]" = OrderedDict()
     
     def _create_default_config(self) -> StrategyConfig:
         """创建默认策略配置"""
@@ -43,13 +74,44 @@ class StrategyEngine:
             max_position_size=self.settings.trading_max_position_size
         )
     
+    @staticmethod
+    def _indicator_config(config: StrategyConfig) -> Dict:
+        """将策略配置转换为指标计算参数"""
+        return {
+            'macd': {
+                'fast_period': config.macd_fast_period,
+                'slow_period': config.macd_slow_period,
+                'signal_period': config.macd_signal_period
+            },
+            'rsi': {
+                'period': config.rsi_period
+            },
+            'bollinger_bands': {
+                'period': config.bb_period,
+                'std_dev': config.bb_std_dev
+            }
+        }
+    
+    @staticmethod
+    def _indicator_params(config: StrategyConfig) -> Tuple:
+        """影响指标计算结果的参数（止损等与指标无关的字段不区分状态）"""
+        return (config.macd_fast_period, config.macd_slow_period, config.macd_signal_period,
+                config.rsi_period, config.bb_period, config.bb_std_dev)
+    
+    def _get_indicator_config(self, config: StrategyConfig) -> Dict:
+        """获取指标计算参数（默认配置直接复用预先构建的结果）"""
+        if config is self.default_config:
+            return self._default_indicator_config
+        return self._indicator_config(config)
+    
     async def initialize(self, market_service: MarketDataService):
         """初始化策略引擎"""
         self.market_service = market_service
         logger.info("Strategy engine initialized")
     
     async def analyze_symbol(self, symbol: str, timeframe: str = "4h", 
-                           limit: int = 200, config: Optional[StrategyConfig] = None) -> Dict:
+                           limit: int = 200, config: Optional[StrategyConfig] = None,
+                           detail: DetailLevel = "full") -> Dict:
         """
         分析交易对并生成信号
         
@@ -58,119 +120,148 @@ class StrategyEngine:
             timeframe: 时间周期
             limit: K线数据条数
             config: 策略配置
+            detail: 返回的指标明细：full全部、latest仅最新一条、signals_only不返回指标
         
         Returns:
             分析结果包含技术指标和信号
         """
+        if config is None:
+            config = self.default_config
+
+        key = self._inflight_key(symbol, timeframe, limit, config.json(), detail)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._analyze_symbol(symbol, timeframe, limit, config, detail))
+            self._track_inflight(key, task)
+
+        # shield避免单个调用方取消时影响其他等待者
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _inflight_key(symbol: str, timeframe: str, limit: int, config_json: str, detail: DetailLevel) -> Tuple:
+        """进行中分析的合并键（单个分析与批量分析共用）"""
+        return (symbol, timeframe, limit, config_json, detail)
+
+    def _track_inflight(self, key: Tuple, future: asyncio.Future):
+        """登记进行中的分析，完成后自动移除"""
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+    async def _analyze_symbol(self, symbol: str, timeframe: str, limit: int,
+                              config: StrategyConfig, detail: DetailLevel = "full") -> Dict:
+        """执行单次分析（由analyze_symbol合并并发请求后调用）"""
         try:
-            if not self.market_service:
-                raise Exception("Market service not initialized")
-            
-            if config is None:
-                config = self.default_config
+            arrays = await self._load_kline_arrays(symbol, timeframe, limit)
             
-            # 获取K线数据
-            klines = await self.market_service.get_klines(
-                symbol=symbol,
-                interval=timeframe,
-                limit=limit
+            # 计算技术指标（CPU密集，放到线程中执行避免阻塞事件循环）
+            indicators_data = await asyncio.to_thread(
+                self.indicator_engine.calculate_all_indicators,
+                arrays,
+                config=self._get_indicator_config(config),
+                symbol=f"{symbol}:{timeframe}"
             )
             
-            if not klines:
-                raise Exception(f"No kline data available for {symbol}")
-            
-            # 转换为指标计算所需的格式
-            kline_dicts = [
-                {
-                    'open_time': kline.open_time,
-                    'close_price': kline.close_price,
-                    'high_price': kline.high_price,
-                    'low_price': kline.low_price,
-                    'volume': kline.volume
-                }
-                for kline in klines
-            ]
-            
-            # 计算技术指标
-            indicators_data = self.indicator_engine.calculate_all_indicators(
-                kline_dicts,
-                config={
-                    'macd': {
-                        'fast_period': config.macd_fast_period,
-                        'slow_period': config.macd_slow_period,
-                        'signal_period': config.macd_signal_period
-                    },
-                    'rsi': {
-                        'period': config.rsi_period
-                    },
-                    'bollinger_bands': {
-                        'period': config.bb_period,
-                        'std_dev': config.bb_std_dev
-                    }
-                }
-            )
-            
-            # 生成交易信号
-            signals = self.indicator_engine.generate_combined_signals(indicators_data)
-            
-            # 转换为API响应格式
-            formatted_indicators = []
-            for ind_data in indicators_data:
-                indicators = TechnicalIndicators(
-                    timestamp=ind_data['timestamp'],
-                    macd=ind_data.get('macd'),
-                    macd_signal=ind_data.get('macd_signal'),
-                    macd_histogram=ind_data.get('macd_histogram'),
-                    rsi=ind_data.get('rsi'),
-                    bb_upper=ind_data.get('bb_upper'),
-                    bb_middle=ind_data.get('bb_middle'),
-                    bb_lower=ind_data.get('bb_lower'),
-                    bb_width=ind_data.get('bb_width')
-                )
-                formatted_indicators.append(indicators)
-            
-            # 转换信号格式
-            formatted_signals = []
-            for signal in signals:
-                signal_data = SignalData(
-                    symbol=symbol,
-                    signal_type=signal['type'],
-                    price=signal['price'],
-                    timestamp=signal['timestamp'],
-                    confidence=signal.get('confidence'),
-                    strategy_name=config.name,
-                    timeframe=timeframe,
-                    reason="; ".join(signal.get('reasons', []))
-                )
-                formatted_signals.append(signal_data)
-            
-            result = {
-                'success': True,
-                'symbol': symbol,
-                'timeframe': timeframe,
-                'indicators': formatted_indicators,
-                'signals': formatted_signals,
-                'signal_count': len(formatted_signals),
-                'data_points': len(indicators_data),
-                'config': config,
-                'analysis_time': datetime.now().isoformat()
-            }
-            
-            logger.info(f"Analysis completed for {symbol}: {len(formatted_signals)} signals generated")
-            return result
+            return await self._build_analysis(symbol, timeframe, config, detail, indicators_data)
             
         except Exception as e:
             logger.error(f"Error analyzing {symbol}: {e}")
-            return {
-                'success': False,
-                'symbol': symbol,
-                'timeframe': timeframe,
-                'error': str(e),
-                'indicators': [],
-                'signals': [],
-                'signal_count': 0,
-                'data_points': 0
-            }
+            return self._analysis_error(symbol, timeframe, e)
+    
+    async def _load_kline_arrays(self, symbol: str, timeframe: str, limit: int) -> Dict[str, np.ndarray]:
+        """获取K线并转换为指标计算所需的列式数组"""
+        if not self.market_service:
+            raise Exception("Market service not initialized")
+        
+        # 获取K线数据
+        klines = await self.market_service.get_klines(
+            symbol=symbol,
+            interval=timeframe,
+            limit=limit
+        )
+        
+        if not klines:
+            raise Exception(f"No kline data available for {symbol}")
+        
+        count = len(klines)
+        return {
+            'open_time': np.fromiter((k.open_time for k in klines), dtype=np.int64, count=count),
+            'close': np.fromiter((k.close_price for k in klines), dtype=np.float64, count=count),
+            'high': np.fromiter((k.high_price for k in klines), dtype=np.float64, count=count),
+            'low': np.fromiter((k.low_price for k in klines), dtype=np.float64, count=count),
+            'volume': np.fromiter((k.volume for k in klines), dtype=np.float64, count=count)
+        }
+    
+    async def _build_analysis(self, symbol: str, timeframe: str, config: StrategyConfig,
+                              detail: DetailLevel, indicators_data: List[Dict]) -> Dict:
+        """根据指标数据生成信号并组装分析结果"""
+        signals = await asyncio.to_thread(self.indicator_engine.generate_combined_signals, indicators_data)
+        
+        # 转换为API响应格式（数据由内部计算产生，跳过校验）
+        if detail == "full":
+            indicator_rows = indicators_data
+        elif detail == "latest":
+            indicator_rows = indicators_data[-1:]
+        else:
+            indicator_rows = []
+        
+        formatted_indicators = [
+            TechnicalIndicators.construct(
+                timestamp=ind_data['timestamp'],
+                macd=ind_data.get('macd'),
+                macd_signal=ind_data.get('macd_signal'),
+                macd_histogram=ind_data.get('macd_histogram'),
+                rsi=ind_data.get('rsi'),
+                bb_upper=ind_data.get('bb_upper'),
+                bb_middle=ind_data.get('bb_middle'),
+                bb_lower=ind_data.get('bb_lower'),
+                bb_width=ind_data.get('bb_width')
+            )
+            for ind_data in indicator_rows
+        ]
+        
+        # 转换信号格式
+        formatted_signals = [
+            SignalData.construct(
+                symbol=symbol,
+                signal_type=signal['type'],
+                price=signal['price'],
+                timestamp=signal['timestamp'],
+                confidence=signal.get('confidence'),
+                strategy_name=config.name,
+                timeframe=timeframe,
+                reason="; ".join(signal.get('reasons', []))
+            )
+            for signal in signals
+        ]
+        
+        result = {
+            'success': True,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'indicators': formatted_indicators,
+            'signals': formatted_signals,
+            'signal_count': len(formatted_signals),
+            'data_points': len(indicators_data),
+            'config': config,
+            'analysis_time': _analysis_time()
+        }
+        
+        logger.info(f"Analysis completed for {symbol}: {len(formatted_signals)} signals generated")
+        return result
+    
+    @staticmethod
+    def _analysis_error(symbol: str, timeframe: str, error: Exception) -> Dict:
+        """分析失败时的返回结果"""
+        return {
+            'success': False,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'error': str(error),
+            'indicators': [],
+            'signals': [],
+            'signal_count': 0,
+            'data_points': 0
+        }
     
     async def get_latest_signals(self, symbol: str, timeframe: str = "4h", 
                                config: Optional[StrategyConfig] = None) -> List[SignalData]:
@@ -186,7 +277,8 @@ class StrategyEngine:
             最新信号列表
         """
         try:
-            result = await self.analyze_symbol(symbol, timeframe, limit=100, config=config)
+            result = await self.analyze_symbol(symbol, timeframe, limit=100, config=config,
+                                               detail="signals_only")
             
             if result['success']:
                 # 返回最近10个信号
@@ -214,18 +306,71 @@ class StrategyEngine:
             最新技术指标
         """
         try:
-            result = await self.analyze_symbol(symbol, timeframe, limit=50, config=config)
+            if not self.market_service:
+                raise Exception("Market service not initialized")
             
-            if result['success'] and result['indicators']:
-                # 返回最新的指标值
-                return result['indicators'][-1]
-            else:
-                logger.error(f"Failed to get indicators for {symbol}: {result.get('error', 'Unknown error')}")
+            if config is None:
+                config = self.default_config
+            
+            key = (symbol, timeframe) + self._indicator_params(config)
+            state = self._state.get(key)
+            
+            # 已有状态时只需获取最近几根K线；增量状态只使用真实数据，避免模拟K线进入状态
+            limit = self.INCREMENTAL_FETCH_LIMIT if state else 50
+            try:
+                klines = await self.market_service.get_klines(
+                    symbol=symbol, interval=timeframe, limit=limit, fallback_to_mock=False
+                )
+                
+                # 首次调用或新数据与状态之间有缺口时重建状态
+                if state is not None and (not klines or klines[0].open_time > state['last_open_time']
+                                          or klines[-1].open_time <= state['last_open_time']):
+                    state = None
+                    klines = await self.market_service.get_klines(
+                        symbol=symbol, interval=timeframe, limit=50, fallback_to_mock=False
+                    )
+            except Exception as e:
+                # 获取真实数据失败时与其他接口一样使用模拟数据，只计算本次结果，不写入状态
+                logger.warning(f"Using mock klines for {symbol} indicators: {e}")
+                klines = await self.market_service.get_klines(symbol=symbol, interval=timeframe, limit=50)
+                if not klines:
+                    raise Exception(f"No kline data available for {symbol}")
+                state = self.indicator_engine.init_incremental_state(self._get_indicator_config(config))
+                self._feed_closed_klines(state, klines)
+                return self._latest_indicators(state, klines[-1])
+            
+            if not klines:
+                raise Exception(f"No kline data available for {symbol}")
+            
+            if state is None:
+                state = self.indicator_engine.init_incremental_state(self._get_indicator_config(config))
+            
+            self._feed_closed_klines(state, klines)
+            self._state[key] = state
+            self._state.move_to_end(key)
+            if len(self._state) > self.INCREMENTAL_STATE_SIZE:
+                self._state.popitem(last=False)
+            
+            return self._latest_indicators(state, klines[-1])
                 
         except Exception as e:
             logger.error(f"Error getting current indicators for {symbol}: {e}")
             return None
     
+    def _feed_closed_klines(self, state: Dict, klines: List[KLineData]):
+        """把状态之后的已收盘K线计入状态（最新一根可能仍在变化，不计入）"""
+        for kline in klines[:-1]:
+            if state['last_open_time'] is None or kline.open_time > state['last_open_time']:
+                self.indicator_engine.update_incremental(state, kline.open_time, kline.close_price)
+    
+    def _latest_indicators(self, state: Dict, latest_kline: KLineData) -> TechnicalIndicators:
+        """在状态副本上计入最新一根K线，得到当前指标（不修改状态本身）"""
+        latest = self.indicator_engine.copy_incremental_state(state)
+        self.indicator_engine.update_incremental(latest, latest_kline.open_time, latest_kline.close_price)
+        snapshot = self.indicator_engine.snapshot_incremental(latest)
+        snapshot.pop('price')
+        return TechnicalIndicators(**snapshot)
+    
     async def evaluate_signal_strength(self, symbol: str, timeframe: str = "4h",
                                      config: Optional[StrategyConfig] = None) -> Dict:
         """
@@ -240,7 +385,8 @@ class StrategyEngine:
             信号强度评估结果
         """
         try:
-            result = await self.analyze_symbol(symbol, timeframe, limit=100, config=config)
+            result = await self.analyze_symbol(symbol, timeframe, limit=100, config=config,
+                                               detail="signals_only")
             
             if not result['success']:
                 return {'strength': 'unknown', 'confidence': 0, 'signals': []}
@@ -250,13 +396,19 @@ class StrategyEngine:
             if not recent_signals:
                 return {'strength': 'neutral', 'confidence': 0, 'signals': []}
             
-            # 计算信号强度
-            buy_count = sum(1 for s in recent_signals if s.signal_type == 'BUY')
-            sell_count = sum(1 for s in recent_signals if s.signal_type == 'SELL')
-            
-            # 计算平均置信度
-            confidences = [s.confidence for s in recent_signals if s.confidence is not None]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            # 单次遍历统计买卖信号数和平均置信度
+            buy_count = sell_count = 0
+            confidence_sum = 0.0
+            confidence_count = 0
+            for s in recent_signals:
+                if s.signal_type == 'BUY':
+                    buy_count += 1
+                elif s.signal_type == 'SELL':
+                    sell_count += 1
+                if s.confidence is not None:
+                    confidence_sum += s.confidence
+                    confidence_count += 1
+            avg_confidence = confidence_sum / confidence_count if confidence_count else 0
             
             # 判断信号强度
             if buy_count > sell_count * 2:
@@ -277,7 +429,7 @@ class StrategyEngine:
                 'sell_signals': sell_count,
                 'total_signals': len(recent_signals),
                 'latest_signal': recent_signals[-1] if recent_signals else None,
-                'analysis_time': datetime.now().isoformat()
+                'analysis_time': _analysis_time()
             }
             
         except Exception as e:
@@ -298,28 +450,30 @@ class StrategyEngine:
             每个交易对的分析结果
         """
         try:
-            results = {}
+            if config is None:
+                config = self.default_config
             
-            # 并发分析多个交易对
-            tasks = []
-            for symbol in symbols:
-                task = asyncio.create_task(
-                    self.analyze_symbol(symbol, timeframe, limit=100, config=config)
-                )
-                tasks.append((symbol, task))
+            # 与analyze_symbol共用进行中的分析：已有相同参数分析的交易对直接等待其结果，
+            # 其余交易对登记为进行中，并发的单个分析请求会等待本次批量计算的结果
+            config_json = config.json()
+            futures: Dict[str, asyncio.Future] = {}
+            pending: Dict[str, asyncio.Future] = {}
+            loop = asyncio.get_running_loop()
+            for symbol in dict.fromkeys(symbols):
+                key = self._inflight_key(symbol, timeframe, self.BATCH_KLINE_LIMIT, config_json, "full")
+                future = self._inflight.get(key)
+                if future is None:
+                    future = loop.create_future()
+                    self._track_inflight(key, future)
+                    pending[symbol] = future
+                futures[symbol] = future
             
-            # 等待所有任务完成
-            for symbol, task in tasks:
-                try:
-                    result = await task
-                    results[symbol] = result
-                except Exception as e:
-                    logger.error(f"Error analyzing {symbol} in batch: {e}")
-                    results[symbol] = {
-                        'success': False,
-                        'symbol': symbol,
-                        'error': str(e)
-                    }
+            if pending:
+                batch_task = asyncio.create_task(self._analyze_batch(list(pending), timeframe, config))
+                batch_task.add_done_callback(lambda task: self._resolve_batch(task, pending))
+            
+            # shield避免调用方取消时影响其他等待者
+            results = {symbol: await asyncio.shield(future) for symbol, future in futures.items()}
             
             logger.info(f"Batch analysis completed for {len(symbols)} symbols")
             return results
@@ -328,39 +482,58 @@ class StrategyEngine:
             logger.error(f"Error in batch analysis: {e}")
             return {}
     
+    async def _analyze_batch(self, symbols: List[str], timeframe: str,
+                             config: StrategyConfig) -> Dict[str, Dict]:
+        """执行批量分析（由batch_analyze过滤掉已在进行中的交易对后调用）"""
+        semaphore = asyncio.Semaphore(self.BATCH_CONCURRENCY)
+        
+        async def load_one(symbol: str) -> Tuple[str, Union[Dict[str, np.ndarray], Exception]]:
+            async with semaphore:
+                try:
+                    return symbol, await self._load_kline_arrays(symbol, timeframe, self.BATCH_KLINE_LIMIT)
+                except Exception as e:
+                    logger.error(f"Error analyzing {symbol} in batch: {e}")
+                    return symbol, e
+        
+        # 限制并发数的同时获取K线，再一次性并行计算所有交易对的指标（命中结果缓存的交易对跳过计算）
+        loaded = await asyncio.gather(*(load_one(symbol) for symbol in symbols))
+        indicators_by_symbol = await asyncio.to_thread(
+            self.indicator_engine.calculate_all_indicators_batch,
+            {symbol: arrays for symbol, arrays in loaded if not isinstance(arrays, Exception)},
+            config=self._get_indicator_config(config),
+            timeframe=timeframe
+        )
+        
+        results = {}
+        for symbol, arrays in loaded:
+            if isinstance(arrays, Exception):
+                results[symbol] = self._analysis_error(symbol, timeframe, arrays)
+            else:
+                results[symbol] = await self._build_analysis(
+                    symbol, timeframe, config, "full", indicators_by_symbol[symbol]
+                )
+        return results
+    
+    @staticmethod
+    def _resolve_batch(task: asyncio.Task, pending: Dict[str, asyncio.Future]):
+        """把批量分析的结果分发给各交易对登记的进行中分析"""
+        for symbol, future in pending.items():
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result()[symbol])
+    
     def get_default_config(self) -> StrategyConfig:
         """获取默认配置"""
         return self.default_config
     
     def validate_config(self, config: StrategyConfig) -> bool:
-        """验证策略配置"""
-        try:
-            # 验证MACD参数
-            if config.macd_fast_period >= config.macd_slow_period:
-                return False
-            
-            # 验证RSI参数
-            if not (1 <= config.rsi_period <= 100):
-                return False
-            if not (0 <= config.rsi_oversold < config.rsi_overbought <= 100):
-                return False
-            
-            # 验证布林带参数
-            if not (1 <= config.bb_period <= 200):
-                return False
-            if not (0.1 <= config.bb_std_dev <= 5.0):
-                return False
-            
-            # 验证风险管理参数
-            if not (0 < config.stop_loss_percent <= 50):
-                return False
-            if not (0 < config.take_profit_percent <= 100):
-                return False
-            if not (0 < config.max_position_size <= 1):
-                return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error validating config: {e}")
-            return False
+        """验证策略配置（规则见StrategyConfig.parameter_errors）"""
+        errors = config.parameter_errors()
+        if errors:
+            logger.warning(f"Invalid strategy config: {'; '.join(errors)}")
+        return not errors
@@ -4,20 +4,36 @@
 """
 
 import logging
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 import ta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple, Union
+
+from ..utils import indicator_kernels
+from ..utils.indicator_kernels import NUMBA_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
 class TechnicalIndicatorEngine:
     """技术指标计算引擎"""
     
+    # 指标结果缓存的最大条数
+    RESULT_CACHE_SIZE = 256
+    
     def __init__(self):
         self.indicators = {}
+        # 逐笔推送的指标状态 {symbol: {'state': 已收盘K线状态, 'open_time': 当前K线, 'close': 最新价}}
+        self._tick_states: Dict[str, Dict] = {}
+        # 指标结果LRU缓存 {(symbol, 首尾时间, 条数, 收盘价, 配置): 结果}
+        self._result_cache: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        # 指标计算可能在线程中执行，缓存读写需加锁
+        self._result_cache_lock = threading.Lock()
+        # 并行内核同一时间只启动一个（workqueue线程层不支持并发启动）
+        self._batch_lock = threading.Lock()
     
-    def calculate_macd(self, prices: List[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict:
+    def calculate_macd(self, prices: Sequence[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict:
         """
         计算MACD指标
         
@@ -35,16 +51,24 @@ class TechnicalIndicatorEngine:
                 logger.warning(f"Not enough data for MACD calculation. Need {slow + signal}, got {len(prices)}")
                 return {'macd': [], 'signal': [], 'histogram': []}
             
-            df = pd.DataFrame({'close': prices})
-            
-            # 使用ta库计算MACD
-            macd = ta.trend.MACD(close=df['close'], window_fast=fast, window_slow=slow, window_sign=signal)
-            
-            result = {
-                'macd': macd.macd().fillna(0).tolist(),
-                'signal': macd.macd_signal().fillna(0).tolist(),
-                'histogram': macd.macd_diff().fillna(0).tolist()
-            }
+            if NUMBA_AVAILABLE:
+                # 编译后的EMA递推，避免pandas开销
+                closes = np.asarray(prices, dtype=np.float64)
+                macd_line, signal_line, histogram = indicator_kernels.macd(closes, fast, slow, signal)
+                result = {
+                    'macd': macd_line.tolist(),
+                    'signal': signal_line.tolist(),
+                    'histogram': histogram.tolist()
+                }
+            else:
+                # 使用ta库计算MACD
+                macd = ta.trend.MACD(close=pd.Series(prices, dtype=np.float64), window_fast=fast, window_slow=slow, window_sign=signal)
+                
+                result = {
+                    'macd': macd.macd().fillna(0).tolist(),
+                    'signal': macd.macd_signal().fillna(0).tolist(),
+                    'histogram': macd.macd_diff().fillna(0).tolist()
+                }
             
             logger.debug(f"MACD calculated for {len(prices)} prices")
             return result
@@ -53,7 +77,7 @@ class TechnicalIndicatorEngine:
             logger.error(f"Error calculating MACD: {e}")
             return {'macd': [], 'signal': [], 'histogram': []}
     
-    def calculate_rsi(self, prices: List[float], period: int = 14) -> List[float]:
+    def calculate_rsi(self, prices: Sequence[float], period: int = 14) -> List[float]:
         """
         计算RSI指标
         
@@ -69,10 +93,13 @@ class TechnicalIndicatorEngine:
                 logger.warning(f"Not enough data for RSI calculation. Need {period + 1}, got {len(prices)}")
                 return []
             
-            df = pd.DataFrame({'close': prices})
-            rsi = ta.momentum.RSIIndicator(close=df['close'], window=period)
-            
-            result = rsi.rsi().fillna(50).tolist()  # 默认值50
+            if NUMBA_AVAILABLE:
+                closes = np.asarray(prices, dtype=np.float64)
+                result = indicator_kernels.rsi(closes, period).tolist()
+            else:
+                rsi = ta.momentum.RSIIndicator(close=pd.Series(prices, dtype=np.float64), window=period)
+                
+                result = rsi.rsi().fillna(50).tolist()  # 默认值50
             
             logger.debug(f"RSI calculated for {len(prices)} prices")
             return result
@@ -81,7 +108,7 @@ class TechnicalIndicatorEngine:
             logger.error(f"Error calculating RSI: {e}")
             return []
     
-    def calculate_bollinger_bands(self, prices: List[float], period: int = 20, std_dev: float = 2.0) -> Dict:
+    def calculate_bollinger_bands(self, prices: Sequence[float], period: int = 20, std_dev: float = 2.0) -> Dict:
         """
         计算布林带指标
         
@@ -99,27 +126,26 @@ class TechnicalIndicatorEngine:
                 logger.warning(f"Not enough data for Bollinger Bands calculation. Need {period}, got {len(prices)}")
                 return {'upper': [], 'middle': [], 'lower': [], 'width': []}
             
-            df = pd.DataFrame({'close': prices})
-            bb = ta.volatility.BollingerBands(close=df['close'], window=period, window_dev=std_dev)
-            
-            upper = bb.bollinger_hband().fillna(0).tolist()
-            middle = bb.bollinger_mavg().fillna(0).tolist()
-            lower = bb.bollinger_lband().fillna(0).tolist()
-            
-            # 计算布林带宽度（标准化）
-            width = []
-            for i in range(len(upper)):
-                if middle[i] > 0:
-                    w = (upper[i] - lower[i]) / middle[i] * 100
-                    width.append(w)
-                else:
-                    width.append(0)
+            if NUMBA_AVAILABLE:
+                # 滑动窗口O(1)更新均值和方差
+                closes = np.asarray(prices, dtype=np.float64)
+                upper, middle, lower, width = indicator_kernels.bollinger_bands(closes, period, float(std_dev))
+            else:
+                bb = ta.volatility.BollingerBands(close=pd.Series(prices, dtype=np.float64), window=period, window_dev=std_dev)
+                
+                upper = np.nan_to_num(bb.bollinger_hband().to_numpy(), nan=0.0)
+                middle = np.nan_to_num(bb.bollinger_mavg().to_numpy(), nan=0.0)
+                lower = np.nan_to_num(bb.bollinger_lband().to_numpy(), nan=0.0)
+                
+                # 计算布林带宽度（标准化）
+                positive = middle > 0
+                width = np.where(positive, (upper - lower) / np.where(positive, middle, 1.0) * 100, 0.0)
             
             result = {
-                'upper': upper,
-                'middle': middle,
-                'lower': lower,
-                'width': width
+                'upper': upper.tolist(),
+                'middle': middle.tolist(),
+                'lower': lower.tolist(),
+                'width': width.tolist()
             }
             
             logger.debug(f"Bollinger Bands calculated for {len(prices)} prices")
@@ -129,24 +155,43 @@ class TechnicalIndicatorEngine:
             logger.error(f"Error calculating Bollinger Bands: {e}")
             return {'upper': [], 'middle': [], 'lower': [], 'width': []}
     
-    def calculate_all_indicators(self, klines: List[Dict], config: Dict = None) -> List[Dict]:
+    @staticmethod
+    def _to_arrays(klines: List[Dict]) -> Dict[str, np.ndarray]:
+        """将K线字典列表转换为列式数组"""
+        count = len(klines)
+        return {
+            'open_time': np.fromiter((k['open_time'] for k in klines), dtype=np.int64, count=count),
+            'close': np.fromiter((k['close_price'] for k in klines), dtype=np.float64, count=count),
+            'high': np.fromiter((k['high_price'] for k in klines), dtype=np.float64, count=count),
+            'low': np.fromiter((k['low_price'] for k in klines), dtype=np.float64, count=count),
+            'volume': np.fromiter((k['volume'] for k in klines), dtype=np.float64, count=count)
+        }
+
+    def calculate_all_indicators(self, klines: Union[Dict[str, np.ndarray], List[Dict]],
+                                 config: Dict = None, symbol: Optional[str] = None) -> List[Dict]:
         """
         计算所有技术指标
         
         Args:
-            klines: K线数据列表
+            klines: 列式K线数组（open_time/close/high/low/volume），兼容K线字典列表
             config: 指标配置参数
+            symbol: 交易对，提供时按数据尾部缓存结果（返回的列表为共享缓存，不应修改）
         
         Returns:
             包含所有指标的列表
         """
         try:
-            if not klines:
+            if len(klines) == 0:
+                return []
+            
+            if not isinstance(klines, dict):
+                klines = self._to_arrays(klines)
+            if len(klines['close']) == 0:
                 return []
             
             # 提取收盘价
-            closes = [float(kline['close_price']) for kline in klines]
-            timestamps = [kline['open_time'] for kline in klines]
+            closes = np.ascontiguousarray(klines['close'], dtype=np.float64)
+            timestamps = klines['open_time'].tolist()
             
             # 获取配置参数
             if config is None:
@@ -156,65 +201,417 @@ class TechnicalIndicatorEngine:
             rsi_config = config.get('rsi', {})
             bb_config = config.get('bollinger_bands', {})
             
-            # 计算各项指标
-            macd_data = self.calculate_macd(
-                closes,
-                fast=macd_config.get('fast_period', 12),
-                slow=macd_config.get('slow_period', 26),
-                signal=macd_config.get('signal_period', 9)
-            )
-            
-            rsi_data = self.calculate_rsi(
-                closes,
-                period=rsi_config.get('period', 14)
-            )
-            
-            bb_data = self.calculate_bollinger_bands(
-                closes,
-                period=bb_config.get('period', 20),
-                std_dev=bb_config.get('std_dev', 2.0)
-            )
-            
-            # 组合所有指标数据
-            result = []
-            data_length = len(closes)
-            
-            for i in range(data_length):
-                indicators = {
-                    'timestamp': timestamps[i],
-                    'price': closes[i]
-                }
-                
-                # MACD指标
-                if i < len(macd_data['macd']):
-                    indicators.update({
-                        'macd': macd_data['macd'][i],
-                        'macd_signal': macd_data['signal'][i],
-                        'macd_histogram': macd_data['histogram'][i]
-                    })
-                
-                # RSI指标
-                if i < len(rsi_data):
-                    indicators['rsi'] = rsi_data[i]
-                
-                # 布林带指标
-                if i < len(bb_data['upper']):
-                    indicators.update({
-                        'bb_upper': bb_data['upper'][i],
-                        'bb_middle': bb_data['middle'][i],
-                        'bb_lower': bb_data['lower'][i],
-                        'bb_width': bb_data['width'][i]
-                    })
-                
-                result.append(indicators)
+            # 相同交易对、相同K线数据和配置时直接返回缓存结果
+            cache_key = None
+            if symbol is not None:
+                cache_key = self._result_cache_key(symbol, timestamps, closes, config)
+                cached = self._get_cached_result(cache_key)
+                if cached is not None:
+                    return cached
+            
+            if NUMBA_AVAILABLE:
+                result = self._calculate_all_fused(closes, timestamps, macd_config, rsi_config, bb_config)
+            else:
+                result = self._calculate_all_ta(closes, timestamps, macd_config, rsi_config, bb_config)
+            
+            if cache_key is not None:
+                self._store_result(cache_key, result)
             
-            logger.info(f"All indicators calculated for {data_length} data points")
             return result
             
         except Exception as e:
             logger.error(f"Error calculating all indicators: {e}")
             return []
     
+    @staticmethod
+    def _result_cache_key(symbol: str, timestamps: List[int], closes: np.ndarray, config: Dict) -> Tuple:
+        """指标结果缓存键：交易对、K线首尾时间、条数、收盘价和配置"""
+        return (symbol, timestamps[0], timestamps[-1], len(timestamps),
+                float(closes[-1]), float(closes.sum()), repr(config))
+    
+    def _get_cached_result(self, cache_key: Tuple) -> Optional[List[Dict]]:
+        """读取指标结果缓存"""
+        with self._result_cache_lock:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+            return cached
+    
+    def _store_result(self, cache_key: Tuple, result: List[Dict]):
+        """写入指标结果缓存（空结果不缓存）"""
+        if not result:
+            return
+        with self._result_cache_lock:
+            self._result_cache[cache_key] = result
+            if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
+    def _calculate_all_ta(self, closes: np.ndarray, timestamps: List[int], macd_config: Dict,
+                          rsi_config: Dict, bb_config: Dict) -> List[Dict]:
+        """使用ta库逐项计算所有指标"""
+        # 计算各项指标
+        macd_data = self.calculate_macd(
+            closes,
+            fast=macd_config.get('fast_period', 12),
+            slow=macd_config.get('slow_period', 26),
+            signal=macd_config.get('signal_period', 9)
+        )
+        
+        rsi_data = self.calculate_rsi(
+            closes,
+            period=rsi_config.get('period', 14)
+        )
+        
+        bb_data = self.calculate_bollinger_bands(
+            closes,
+            period=bb_config.get('period', 20),
+            std_dev=bb_config.get('std_dev', 2.0)
+        )
+        
+        # 组合所有指标数据（数据不足的指标返回空列表，不输出）
+        columns = {}
+        if macd_data['macd']:
+            columns.update(macd=macd_data['macd'], macd_signal=macd_data['signal'],
+                           macd_histogram=macd_data['histogram'])
+        if rsi_data:
+            columns['rsi'] = rsi_data
+        if bb_data['upper']:
+            columns.update(bb_upper=bb_data['upper'], bb_middle=bb_data['middle'],
+                           bb_lower=bb_data['lower'], bb_width=bb_data['width'])
+        
+        return self._build_rows(timestamps, closes, columns)
+    
+    @staticmethod
+    def _kernel_params(config: Dict) -> Tuple[int, int, int, int, int, float]:
+        """从指标配置提取内核参数 (fast, slow, signal, rsi_period, bb_period, bb_k)"""
+        macd_config = config.get('macd', {})
+        bb_config = config.get('bollinger_bands', {})
+        return (
+            macd_config.get('fast_period', 12),
+            macd_config.get('slow_period', 26),
+            macd_config.get('signal_period', 9),
+            config.get('rsi', {}).get('period', 14),
+            bb_config.get('period', 20),
+            float(bb_config.get('std_dev', 2.0))
+        )
+    
+    def _calculate_all_fused(self, closes: np.ndarray, timestamps: List[int], macd_config: Dict,
+                             rsi_config: Dict, bb_config: Dict) -> List[Dict]:
+        """使用编译后的融合内核单次遍历计算所有指标"""
+        params = self._kernel_params({'macd': macd_config, 'rsi': rsi_config, 'bollinger_bands': bb_config})
+        table = indicator_kernels.compute_all(closes, *params)
+        return self._rows_from_table(closes, timestamps, table, params)
+    
+    def _rows_from_table(self, closes: np.ndarray, timestamps: List[int], table: np.ndarray,
+                         params: Tuple) -> List[Dict]:
+        """将内核输出的(n, 8)数组转换为指标行"""
+        _, slow, signal, rsi_period, bb_period, _ = params
+        
+        # 与逐项计算保持一致：数据不足的指标不输出
+        data_length = len(closes)
+        selected = []
+        if data_length >= slow + signal:
+            selected.extend((0, 1, 2))
+        if data_length >= rsi_period + 1:
+            selected.append(3)
+        if data_length >= bb_period:
+            selected.extend((4, 5, 6, 7))
+        
+        columns = {indicator_kernels.ALL_COLUMNS[j]: table[:, j].tolist() for j in selected}
+        return self._build_rows(timestamps, closes, columns)
+    
+    @staticmethod
+    def _build_rows(timestamps: List[int], closes: np.ndarray, columns: Dict[str, List[float]]) -> List[Dict]:
+        """按列组装逐行的指标字典"""
+        names = ('timestamp', 'price') + tuple(columns)
+        result = [dict(zip(names, values)) for values in zip(timestamps, closes.tolist(), *columns.values())]
+        
+        logger.info(f"All indicators calculated for {len(result)} data points")
+        return result
+    
+    def calculate_all_indicators_batch(self, klines_by_symbol: Dict[str, Dict[str, np.ndarray]],
+                                       config: Dict = None,
+                                       timeframe: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        批量计算多个交易对的所有技术指标（numba可用时按交易对多核并行）
+        
+        Args:
+            klines_by_symbol: {交易对: 列式K线数组}
+            config: 指标配置参数
+            timeframe: 时间周期，提供时与calculate_all_indicators(symbol="交易对:周期")共用结果缓存
+        
+        Returns:
+            {交易对: 指标列表}
+        """
+        if config is None:
+            config = {}
+        
+        def cache_symbol(symbol: str) -> Optional[str]:
+            return f"{symbol}:{timeframe}" if timeframe is not None else None
+        
+        if not NUMBA_AVAILABLE or not klines_by_symbol:
+            return {
+                symbol: self.calculate_all_indicators(klines, config, symbol=cache_symbol(symbol))
+                for symbol, klines in klines_by_symbol.items()
+            }
+        
+        results = {}
+        cache_keys = {}
+        if timeframe is not None:
+            # 已有缓存结果的交易对不再进入并行内核
+            for symbol, klines in klines_by_symbol.items():
+                if len(klines['close']) == 0:
+                    continue
+                cache_key = self._result_cache_key(
+                    cache_symbol(symbol), klines['open_time'].tolist(),
+                    np.asarray(klines['close'], dtype=np.float64), config
+                )
+                cached = self._get_cached_result(cache_key)
+                if cached is not None:
+                    results[symbol] = cached
+                else:
+                    cache_keys[symbol] = cache_key
+        
+        try:
+            symbols = [symbol for symbol in klines_by_symbol if symbol not in results]
+            if not symbols:
+                return results
+            closes_list = [np.asarray(klines_by_symbol[symbol]['close'], dtype=np.float64) for symbol in symbols]
+            lengths = np.fromiter((len(closes) for closes in closes_list), dtype=np.int64, count=len(symbols))
+            
+            # 长度不同的序列按最长对齐，每行只使用前lengths[s]个数据
+            matrix = np.zeros((len(symbols), int(lengths.max())))
+            for row, closes in enumerate(closes_list):
+                matrix[row, :len(closes)] = closes
+            
+            params = self._kernel_params(config)
+            with self._batch_lock:
+                table = indicator_kernels.compute_all_batch(matrix, lengths, *params)
+            
+            for row, symbol in enumerate(symbols):
+                length = int(lengths[row])
+                timestamps = klines_by_symbol[symbol]['open_time'].tolist()
+                results[symbol] = (
+                    self._rows_from_table(closes_list[row], timestamps, table[row, :length], params)
+                    if length else []
+                )
+                if symbol in cache_keys:
+                    self._store_result(cache_keys[symbol], results[symbol])
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error calculating batch indicators: {e}")
+            return {symbol: results.get(symbol, []) for symbol in klines_by_symbol}
+    
+    def init_incremental_state(self, config: Dict = None) -> Dict:
+        """
+        创建增量指标计算状态（与calculate_all_indicators的结果保持一致）
+        
+        Args:
+            config: 指标配置参数
+        
+        Returns:
+            指标递推状态
+        """
+        if config is None:
+            config = {}
+        
+        macd_config = config.get('macd', {})
+        rsi_config = config.get('rsi', {})
+        bb_config = config.get('bollinger_bands', {})
+        bb_period = bb_config.get('period', 20)
+        
+        return {
+            'fast_period': macd_config.get('fast_period', 12),
+            'slow_period': macd_config.get('slow_period', 26),
+            'signal_period': macd_config.get('signal_period', 9),
+            'rsi_period': rsi_config.get('period', 14),
+            'bb_period': bb_period,
+            'bb_std_dev': bb_config.get('std_dev', 2.0),
+            'count': 0,
+            'last_open_time': None,
+            'last_close': None,
+            'ema_fast': None,
+            'ema_slow': None,
+            'macd_signal': None,
+            'rsi_avg_gain': 0.0,
+            'rsi_avg_loss': 0.0,
+            # 布林带窗口使用float64环形缓冲区，配合滑动均值/平方差和O(1)更新
+            'bb_ring': np.empty(bb_period, dtype=np.float64),
+            'bb_index': 0,
+            'bb_mean': 0.0,
+            'bb_m2': 0.0
+        }
+    
+    @staticmethod
+    def copy_incremental_state(state: Dict) -> Dict:
+        """复制增量指标状态"""
+        copied = dict(state)
+        copied['bb_ring'] = state['bb_ring'].copy()
+        return copied
+    
+    def update_incremental(self, state: Dict, open_time: int, close: float) -> Dict:
+        """
+        用一根新K线更新指标状态（每根K线O(1)）
+        
+        Args:
+            state: 指标递推状态
+            open_time: K线开盘时间
+            close: 收盘价
+        
+        Returns:
+            更新后的状态
+        """
+        close = float(close)
+        
+        if state['count'] == 0:
+            # 与ta库的EMA一致：以第一个值作为初始值，首个差分记为0
+            state['ema_fast'] = close
+            state['ema_slow'] = close
+        else:
+            alpha_fast = 2 / (state['fast_period'] + 1)
+            alpha_slow = 2 / (state['slow_period'] + 1)
+            state['ema_fast'] += alpha_fast * (close - state['ema_fast'])
+            state['ema_slow'] += alpha_slow * (close - state['ema_slow'])
+            
+            alpha_rsi = 1 / state['rsi_period']
+            diff = close - state['last_close']
+            state['rsi_avg_gain'] += alpha_rsi * (max(diff, 0.0) - state['rsi_avg_gain'])
+            state['rsi_avg_loss'] += alpha_rsi * (max(-diff, 0.0) - state['rsi_avg_loss'])
+        
+        state['count'] += 1
+        
+        # 慢线EMA有效后才开始计算MACD信号线
+        if state['count'] >= state['slow_period']:
+            macd = state['ema_fast'] - state['ema_slow']
+            if state['macd_signal'] is None:
+                state['macd_signal'] = macd
+            else:
+                alpha_signal = 2 / (state['signal_period'] + 1)
+                state['macd_signal'] += alpha_signal * (macd - state['macd_signal'])
+        
+        # 布林带：滑动窗口Welford算法，与编译内核保持一致
+        count = state['count']
+        period = state['bb_period']
+        ring = state['bb_ring']
+        index = state['bb_index']
+        if count <= period:
+            delta = close - state['bb_mean']
+            state['bb_mean'] += delta / count
+            state['bb_m2'] += delta * (close - state['bb_mean'])
+            ring[index] = close
+        elif (count - 1) % indicator_kernels.RESYNC_INTERVAL == 0:
+            # 定期从窗口重新计算，避免长时间运行累积舍入误差
+            ring[index] = close
+            state['bb_mean'] = float(ring.mean())
+            state['bb_m2'] = float(((ring - state['bb_mean']) ** 2).sum())
+        else:
+            oldest = ring[index]
+            mean = state['bb_mean']
+            new_mean = mean + (close - oldest) / period
+            state['bb_m2'] += (close - oldest) * (close - new_mean + oldest - mean)
+            state['bb_mean'] = new_mean
+            ring[index] = close
+        state['bb_index'] = (index + 1) % period
+        
+        state['last_open_time'] = open_time
+        state['last_close'] = close
+        return state
+    
+    def snapshot_incremental(self, state: Dict) -> Dict:
+        """
+        读取增量状态对应的最新指标值
+        
+        Args:
+            state: 指标递推状态
+        
+        Returns:
+            最新一根K线的指标字典
+        """
+        count = state['count']
+        indicators = {
+            'timestamp': state['last_open_time'],
+            'price': state['last_close']
+        }
+        
+        if count >= state['slow_period'] + state['signal_period']:
+            macd = state['ema_fast'] - state['ema_slow']
+            indicators.update({
+                'macd': macd,
+                'macd_signal': state['macd_signal'],
+                'macd_histogram': macd - state['macd_signal']
+            })
+        
+        if count >= state['rsi_period'] + 1:
+            avg_loss = state['rsi_avg_loss']
+            if avg_loss == 0:
+                indicators['rsi'] = 100.0
+            else:
+                indicators['rsi'] = 100 - 100 / (1 + state['rsi_avg_gain'] / avg_loss)
+        
+        if count >= state['bb_period']:
+            middle = state['bb_mean']
+            deviation = np.sqrt(max(state['bb_m2'] / state['bb_period'], 0.0)) * state['bb_std_dev']
+            upper = middle + deviation
+            lower = middle - deviation
+            indicators.update({
+                'bb_upper': upper,
+                'bb_middle': middle,
+                'bb_lower': lower,
+                'bb_width': (upper - lower) / middle * 100 if middle > 0 else 0
+            })
+        
+        return indicators
+    
+    def seed_ticks(self, symbol: str, open_times: Sequence[int], closes: Sequence[float],
+                   config: Dict = None):
+        """
+        用历史K线初始化交易对的逐笔指标状态（最后一根视为未收盘）
+        
+        Args:
+            symbol: 交易对符号
+            open_times: K线开盘时间
+            closes: 收盘价
+            config: 指标配置参数
+        """
+        state = self.init_incremental_state(config)
+        for open_time, close in zip(open_times[:-1], closes[:-1]):
+            self.update_incremental(state, open_time, close)
+        
+        self._tick_states[symbol] = {
+            'state': state,
+            'open_time': open_times[-1] if len(open_times) else None,
+            'close': float(closes[-1]) if len(closes) else None
+        }
+    
+    def push_tick(self, symbol: str, close: float, open_time: Optional[int] = None) -> Dict:
+        """
+        推送一笔最新价格并返回最新指标（每笔O(1)更新）
+        
+        Args:
+            symbol: 交易对符号
+            close: 最新价格
+            open_time: 所属K线的开盘时间，为空时每笔视为一根新K线
+        
+        Returns:
+            最新指标字典
+        """
+        entry = self._tick_states.get(symbol)
+        if entry is None:
+            entry = {'state': self.init_incremental_state(), 'open_time': None, 'close': None}
+            self._tick_states[symbol] = entry
+        elif entry['close'] is not None and (open_time is None or open_time != entry['open_time']):
+            # 新K线开始，上一根计入状态
+            self.update_incremental(entry['state'], entry['open_time'], entry['close'])
+        
+        entry['open_time'] = open_time
+        entry['close'] = float(close)
+        
+        # 未收盘K线只在副本上计算，后续价格变化不会污染状态
+        latest = self.copy_incremental_state(entry['state'])
+        self.update_incremental(latest, open_time, close)
+        return self.snapshot_incremental(latest)
+    
     def detect_macd_signals(self, macd_data: List[Dict]) -> List[Dict]:
         """
         检测MACD信号（金叉死叉）
@@ -228,41 +625,30 @@ class TechnicalIndicatorEngine:
         signals = []
         
         try:
-            for i in range(1, len(macd_data)):
+            if len(macd_data) < 2:
+                return signals
+            if not all(key in macd_data[0] for key in ['macd', 'macd_signal', 'timestamp', 'price']):
+                return signals
+            
+            macd = self._column(macd_data, 'macd')
+            macd_signal = self._column(macd_data, 'macd_signal')
+            diff = macd - macd_signal
+            
+            # 金叉信号（MACD线从下方穿越信号线）/ 死叉信号（MACD线从上方穿越信号线）
+            golden = (diff[:-1] <= 0) & (diff[1:] > 0)
+            dead = (diff[:-1] >= 0) & (diff[1:] < 0)
+            
+            for i in (np.flatnonzero(golden | dead) + 1).tolist():
                 current = macd_data[i]
-                previous = macd_data[i-1]
-                
-                # 检查是否有必要的数据
-                if not all(key in current for key in ['macd', 'macd_signal', 'timestamp', 'price']):
-                    continue
-                if not all(key in previous for key in ['macd', 'macd_signal']):
-                    continue
-                
-                # 金叉信号（MACD线从下方穿越信号线）
-                if (previous['macd'] <= previous['macd_signal'] and 
-                    current['macd'] > current['macd_signal']):
-                    
-                    signals.append({
-                        'type': 'BUY',
-                        'reason': 'MACD金叉',
-                        'timestamp': current['timestamp'],
-                        'price': current['price'],
-                        'macd': current['macd'],
-                        'macd_signal': current['macd_signal']
-                    })
-                
-                # 死叉信号（MACD线从上方穿越信号线）
-                elif (previous['macd'] >= previous['macd_signal'] and 
-                      current['macd'] < current['macd_signal']):
-                    
-                    signals.append({
-                        'type': 'SELL',
-                        'reason': 'MACD死叉',
-                        'timestamp': current['timestamp'],
-                        'price': current['price'],
-                        'macd': current['macd'],
-                        'macd_signal': current['macd_signal']
-                    })
+                is_golden = golden[i - 1]
+                signals.append({
+                    'type': 'BUY' if is_golden else 'SELL',
+                    'reason': 'MACD金叉' if is_golden else 'MACD死叉',
+                    'timestamp': current['timestamp'],
+                    'price': current['price'],
+                    'macd': current['macd'],
+                    'macd_signal': current['macd_signal']
+                })
             
         except Exception as e:
             logger.error(f"Error detecting MACD signals: {e}")
@@ -362,6 +748,11 @@ class TechnicalIndicatorEngine:
         
         return signals
     
+    @staticmethod
+    def _column(rows: List[Dict], key: str) -> np.ndarray:
+        """提取指标行中的一列为float64数组"""
+        return np.fromiter((row[key] for row in rows), dtype=np.float64, count=len(rows))
+    
     def generate_combined_signals(self, indicators_data: List[Dict], config: Dict = None) -> List[Dict]:
         """
         生成组合信号（多指标组合）
@@ -377,55 +768,69 @@ class TechnicalIndicatorEngine:
             if not indicators_data:
                 return []
             
-            # 获取各项信号
-            macd_signals = self.detect_macd_signals(indicators_data)
-            rsi_signals = self.detect_rsi_signals(indicators_data)
-            bb_signals = self.detect_bollinger_signals(indicators_data)
-            
-            # 按时间戳组织信号
-            signal_map = {}
-            
-            for signal in macd_signals + rsi_signals + bb_signals:
-                timestamp = signal['timestamp']
-                if timestamp not in signal_map:
-                    signal_map[timestamp] = {
-                        'timestamp': timestamp,
-                        'price': signal['price'],
-                        'buy_signals': [],
-                        'sell_signals': []
-                    }
-                
-                if signal['type'] == 'BUY':
-                    signal_map[timestamp]['buy_signals'].append(signal['reason'])
-                else:
-                    signal_map[timestamp]['sell_signals'].append(signal['reason'])
+            # 指标行由calculate_all_indicators生成，各行字段一致，按首行判断可用指标
+            first = indicators_data[0]
+            if 'timestamp' not in first or 'price' not in first:
+                return []
             
-            # 生成最终信号
+            n = len(indicators_data)
+            timestamps = [row['timestamp'] for row in indicators_data]
+            prices = self._column(indicators_data, 'price')
+            oversold, overbought = 30, 70
+            
+            # 各指标的买卖命中掩码（按索引对齐，首根K线无交叉）
+            buy_masks = []
+            sell_masks = []
+            
+            # MACD金叉死叉：差值符号变化
+            if 'macd' in first and 'macd_signal' in first:
+                diff = self._column(indicators_data, 'macd') - self._column(indicators_data, 'macd_signal')
+                golden, dead = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+                golden[1:] = (diff[:-1] <= 0) & (diff[1:] > 0)
+                dead[1:] = (diff[:-1] >= 0) & (diff[1:] < 0)
+                buy_masks.append((golden, lambda i: 'MACD金叉'))
+                sell_masks.append((dead, lambda i: 'MACD死叉'))
+            
+            # RSI超买超卖：阈值穿越
+            if 'rsi' in first:
+                rsi = self._column(indicators_data, 'rsi')
+                rebound, pullback = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+                rebound[1:] = (rsi[:-1] <= oversold) & (rsi[1:] > oversold)
+                pullback[1:] = (rsi[:-1] >= overbought) & (rsi[1:] < overbought)
+                buy_masks.append((rebound, lambda i: f'RSI超卖反弹(RSI:{rsi[i]:.2f})'))
+                sell_masks.append((pullback, lambda i: f'RSI超买回调(RSI:{rsi[i]:.2f})'))
+            
+            # 布林带上下轨
+            if 'bb_upper' in first and 'bb_lower' in first:
+                touch_lower = prices <= self._column(indicators_data, 'bb_lower')
+                touch_upper = (prices >= self._column(indicators_data, 'bb_upper')) & ~touch_lower
+                buy_masks.append((touch_lower, lambda i: '价格触及布林带下轨'))
+                sell_masks.append((touch_upper, lambda i: '价格触及布林带上轨'))
+            
+            if not buy_masks:
+                return []
+            
+            buy_counts = np.sum([mask for mask, _ in buy_masks], axis=0)
+            sell_counts = np.sum([mask for mask, _ in sell_masks], axis=0)
+            
+            # 生成最终信号（只遍历命中的稀疏位置）
             combined_signals = []
             
-            for timestamp, data in signal_map.items():
-                buy_count = len(data['buy_signals'])
-                sell_count = len(data['sell_signals'])
+            for i in np.flatnonzero((buy_counts >= 2) | (sell_counts >= 2)).tolist():
+                # 信号强度判断：至少2个同向信号，买入优先
+                if buy_counts[i] >= 2:
+                    signal_type, masks, count = 'BUY', buy_masks, int(buy_counts[i])
+                else:
+                    signal_type, masks, count = 'SELL', sell_masks, int(sell_counts[i])
                 
-                # 信号强度判断
-                if buy_count >= 2:  # 至少2个买入信号
-                    combined_signals.append({
-                        'type': 'BUY',
-                        'timestamp': timestamp,
-                        'price': data['price'],
-                        'confidence': min(buy_count / 3, 1.0),
-                        'reasons': data['buy_signals'],
-                        'signal_count': buy_count
-                    })
-                elif sell_count >= 2:  # 至少2个卖出信号
-                    combined_signals.append({
-                        'type': 'SELL',
-                        'timestamp': timestamp,
-                        'price': data['price'],
-                        'confidence': min(sell_count / 3, 1.0),
-                        'reasons': data['sell_signals'],
-                        'signal_count': sell_count
-                    })
+                combined_signals.append({
+                    'type': signal_type,
+                    'timestamp': timestamps[i],
+                    'price': float(prices[i]),
+                    'confidence': min(count / 3, 1.0),
+                    'reasons': [reason(i) for mask, reason in masks if mask[i]],
+                    'signal_count': count
+                })
             
             logger.info(f"Generated {len(combined_signals)} combined signals")
             return combined_signals
@@ -6,46 +6,145 @@ WebSocket管理器
 import asyncio
 import json
 import logging
-from typing import Dict, List, Set, Optional
+from typing import AsyncIterator, Dict, List, Set, Optional, Sequence, Tuple, Union
 from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
 from datetime import datetime
 
+from .technical_indicators import TechnicalIndicatorEngine
+from ..utils.ticker import ticker
+
+try:
+    import orjson
+except ImportError:  # orjson不可用时退回标准库
+    orjson = None
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # redis为可选依赖，未安装时只在进程内广播
+    aioredis = None
+
 logger = logging.getLogger(__name__)
 
+def _dumps(message: dict) -> bytes:
+    """序列化推送消息"""
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(message, default=str).encode()
+
+def _loads(message: Union[str, bytes]):
+    """解析客户端消息（orjson.JSONDecodeError是json.JSONDecodeError的子类）"""
+    if orjson is not None:
+        return orjson.loads(message)
+    return json.loads(message)
+
+class Connection:
+    """单个WebSocket连接的状态（使用__slots__，不为每个连接分配属性字典）"""
+    
+    __slots__ = ('websocket', 'client_id', 'connected_at', 'subscriptions', 'queue', 'writer')
+    
+    def __init__(self, websocket: WebSocket, client_id: str, queue: asyncio.Queue):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.connected_at = datetime.now()
+        # 已订阅的交易对
+        self.subscriptions: Set[str] = set()
+        # 发送队列和写任务，断开后置为None
+        self.queue: Optional[asyncio.Queue] = queue
+        self.writer: Optional[asyncio.Task] = None
+
 class WebSocketManager:
     """WebSocket连接管理器"""
     
     def __init__(self):
-        # 存储活跃连接
-        self.active_connections: List[WebSocket] = []
-        # 订阅管理 {symbol: {websockets}}
-        self.subscriptions: Dict[str, Set[WebSocket]] = {}
-        # 连接元数据
-        self.connection_info: Dict[WebSocket, Dict] = {}
+        # 活跃连接 {websocket: Connection}（dict保持插入顺序，增删均为O(1)）
+        self.connections: Dict[WebSocket, Connection] = {}
+        # 订阅管理 {symbol: {connections}}
+        self.subscriptions: Dict[str, Set[Connection]] = {}
+        # 订阅者快照 {symbol: (connections)}，仅在订阅变化时重建，推送时直接遍历
+        self._subscribers: Dict[str, Tuple[Connection, ...]] = {}
         # 是否运行中
         self.is_running = False
+        # 指标引擎（设置后价格推送附带增量计算的最新指标）
+        self.indicator_engine: Optional[TechnicalIndicatorEngine] = None
+        # 当前时间的ISO字符串，有客户端连接时由全局定时循环刷新，消息直接读取
+        self._clock_iso = datetime.now().isoformat()
+        self._clock_active = False
+        # Redis广播通道（多进程部署时启用），未启用时广播只在本进程内投递
+        self._redis = None
+        self._pubsub = None
+        self._backplane_task: Optional[asyncio.Task] = None
+    
+    # 时间字符串刷新间隔（秒）
+    CLOCK_INTERVAL = 0.01
+    # 广播时每批入队的连接数，批次之间让出事件循环
+    BROADCAST_BATCH_SIZE = 50
+    # 单个连接待发送消息的上限，超过后丢弃新消息（客户端过慢）
+    SEND_QUEUE_SIZE = 1000
+    # 单个连接已接收未处理消息的上限，达到后暂停读取（反压到客户端）
+    RECEIVE_QUEUE_SIZE = 100
+    # Redis广播频道：全体广播和按交易对广播
+    BACKPLANE_PREFIX = 'ws:'
+    BROADCAST_CHANNEL = 'ws:broadcast'
+    SYMBOL_CHANNEL_PREFIX = 'ws:symbol:'
+    
+    # 时间刷新在全局定时循环中的任务名
+    CLOCK_JOB = 'websocket_clock'
+    
+    def start(self):
+        """启动管理器（需在事件循环中调用）"""
+        self.is_running = True
+        ticker.start()
+    
+    @property
+    def _now_iso(self) -> str:
+        """当前时间的ISO字符串（无客户端连接、时间刷新暂停时直接计算）"""
+        if self._clock_active:
+            return self._clock_iso
+        return datetime.now().isoformat()
+    
+    def _refresh_clock(self):
+        """刷新当前时间字符串"""
+        self._clock_iso = datetime.now().isoformat()
+    
+    def _start_clock(self):
+        """有客户端连接时在全局定时循环中注册时间刷新"""
+        if not self._clock_active:
+            self._refresh_clock()
+            self._clock_active = True
+            ticker.register(self.CLOCK_JOB, self._refresh_clock, every=self.CLOCK_INTERVAL)
+            ticker.start()
+    
+    def _stop_clock(self):
+        """最后一个客户端断开后停止时间刷新，定时循环不再为其唤醒"""
+        if self._clock_active:
+            self._clock_active = False
+            ticker.unregister(self.CLOCK_JOB)
         
     async def connect(self, websocket: WebSocket, client_id: Optional[str] = None):
         """接受WebSocket连接"""
         try:
             await websocket.accept()
-            self.active_connections.append(websocket)
+            self.is_running = True
             
-            # 存储连接信息
-            self.connection_info[websocket] = {
-                'client_id': client_id or f"client_{len(self.active_connections)}",
-                'connected_at': datetime.now(),
-                'subscriptions': set()
-            }
+            # 存储连接信息并启动该连接的写任务（同一轮事件循环内产生的消息合并为一帧发送）
+            connection = Connection(
+                websocket,
+                client_id or f"client_{len(self.connections) + 1}",
+                asyncio.Queue(maxsize=self.SEND_QUEUE_SIZE)
+            )
+            self.connections[websocket] = connection
+            connection.writer = asyncio.create_task(self._writer(connection))
+            self._start_clock()
             
-            logger.info(f"WebSocket连接已建立: {self.connection_info[websocket]['client_id']}")
+            logger.info(f"WebSocket连接已建立: {connection.client_id}")
             
             # 发送欢迎消息
             await self.send_personal_message({
                 'type': 'connection',
                 'status': 'connected',
-                'client_id': self.connection_info[websocket]['client_id'],
-                'timestamp': datetime.now().isoformat()
+                'client_id': connection.client_id,
+                'timestamp': self._now_iso
             }, websocket)
             
         except Exception as e:
@@ -55,21 +154,23 @@ class WebSocketManager:
     async def disconnect(self, websocket: WebSocket):
         """断开WebSocket连接"""
         try:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
+            connection = self.connections.pop(websocket, None)
+            if connection is None:
+                return
+            if not self.connections:
+                self._stop_clock()
+            
+            # 停止写任务（由写任务自身触发断开时不取消自己）
+            connection.queue = None
+            writer, connection.writer = connection.writer, None
+            if writer is not None and writer is not asyncio.current_task():
+                writer.cancel()
             
             # 清理订阅
-            if websocket in self.connection_info:
-                client_info = self.connection_info[websocket]
-                for symbol in client_info.get('subscriptions', set()):
-                    if symbol in self.subscriptions:
-                        self.subscriptions[symbol].discard(websocket)
-                        if not self.subscriptions[symbol]:
-                            del self.subscriptions[symbol]
-                
-                client_id = client_info.get('client_id', 'unknown')
-                logger.info(f"WebSocket连接已断开: {client_id}")
-                del self.connection_info[websocket]
+            for symbol in connection.subscriptions:
+                self._remove_subscriber(symbol, connection)
+            
+            logger.info(f"WebSocket连接已断开: {connection.client_id}")
                 
         except Exception as e:
             logger.error(f"WebSocket断开处理失败: {e}")
@@ -78,65 +179,211 @@ class WebSocketManager:
         """发送个人消息"""
         
         try:
-            await websocket.send_text(json.dumps(message))
+            payload = _dumps(message)
+            connection = self.connections.get(websocket)
+            if connection is not None:
+                self._enqueue(connection, payload)
+            else:
+                await websocket.send_bytes(payload)
         except Exception as e:
             logger.error(f"发送个人消息失败: {e}")
             await self.disconnect(websocket)
     
     async def broadcast(self, message: dict):
-        """广播消息给所有连接"""
-        if not self.active_connections:
+        """广播消息给所有连接（启用Redis广播通道时发布到所有进程）"""
+        if self._redis is None and not self.connections:
             return
         
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"广播消息失败: {e}")
-                disconnected.append(connection)
-        
-        # 清理断开的连接
-        for connection in disconnected:
-            await self.disconnect(connection)
+        # 只序列化一次，所有连接共用同一份数据
+        payload = _dumps(message)
+        if not await self._publish(self.BROADCAST_CHANNEL, payload):
+            await self._local_broadcast(self.BROADCAST_CHANNEL, payload)
     
     async def broadcast_to_symbol(self, symbol: str, message: dict):
-        """向订阅特定交易对的客户端广播消息"""
-        if symbol not in self.subscriptions:
+        """向订阅特定交易对的客户端广播消息（启用Redis广播通道时发布到所有进程）"""
+        if self._redis is None and not self._subscribers.get(symbol):
             return
         
-        disconnected = []
-        for websocket in self.subscriptions[symbol].copy():
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"向{symbol}订阅者广播失败: {e}")
-                disconnected.append(websocket)
+        payload = _dumps(message)
+        channel = self.SYMBOL_CHANNEL_PREFIX + symbol
+        if not await self._publish(channel, payload):
+            await self._local_broadcast(channel, payload)
+    
+    async def _publish(self, channel: str, payload: bytes) -> bool:
+        """发布到Redis频道，未启用或发布失败时返回False（由调用方在本进程内投递）"""
+        if self._redis is None:
+            return False
         
-        # 清理断开的连接
-        for websocket in disconnected:
-            await self.disconnect(websocket)
+        try:
+            await self._redis.publish(channel, payload)
+            return True
+        except Exception as e:
+            logger.warning(f"Redis发布失败，改为进程内广播: {e}")
+            return False
+    
+    async def _local_broadcast(self, channel: str, payload: bytes):
+        """将频道消息投递给本进程内的连接"""
+        if channel == self.BROADCAST_CHANNEL:
+            connections = tuple(self.connections.values())
+        elif channel.startswith(self.SYMBOL_CHANNEL_PREFIX):
+            connections = self._subscribers.get(channel[len(self.SYMBOL_CHANNEL_PREFIX):])
+        else:
+            return
+        
+        if connections:
+            await self._send_all(connections, payload)
+    
+    async def start_backplane(self, redis_url: Optional[str]) -> bool:
+        """
+        启用Redis广播通道：订阅ws:*频道，把其他进程发布的消息投递给本进程的连接
+
+        只转发WebSocket广播；多进程时的行情接收由持有行情锁的单个进程负责（见main._start_ingestion）
+
+        Args:
+            redis_url: Redis连接地址
+
+        Returns:
+            是否启用成功（Redis不可用时保持进程内广播）
+        """
+        if aioredis is None or not redis_url:
+            logger.warning("Redis不可用，WebSocket广播只覆盖本进程的连接")
+            return False
+        
+        try:
+            redis = aioredis.from_url(redis_url)
+            await redis.ping()
+            pubsub = redis.pubsub()
+            await pubsub.psubscribe(f"{self.BACKPLANE_PREFIX}*")
+        except Exception as e:
+            logger.warning(f"Redis广播通道启用失败，WebSocket广播只覆盖本进程的连接: {e}")
+            return False
+        
+        self._redis = redis
+        self._pubsub = pubsub
+        self._backplane_task = asyncio.create_task(self._backplane_loop(pubsub))
+        logger.info("WebSocket Redis广播通道已启用")
+        return True
+    
+    async def _backplane_loop(self, pubsub):
+        """接收Redis频道消息并投递给本进程的连接"""
+        try:
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                channel = message['channel']
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                await self._local_broadcast(channel, message['data'])
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 订阅中断后不再经Redis发布，避免本进程的客户端收不到消息
+            logger.error(f"Redis广播通道中断，改为进程内广播: {e}")
+            self._redis = None
+    
+    async def stop_backplane(self):
+        """关闭Redis广播通道"""
+        task, self._backplane_task = self._backplane_task, None
+        if task is not None:
+            task.cancel()
+        
+        pubsub, self._pubsub = self._pubsub, None
+        redis, self._redis = self._redis, None
+        try:
+            if pubsub is not None:
+                await pubsub.close()
+            if redis is not None:
+                await redis.close()
+        except Exception as e:
+            logger.error(f"关闭Redis广播通道失败: {e}")
+    
+    async def _send_all(self, connections: Sequence[Connection], payload: bytes):
+        """将消息放入多个连接的发送队列"""
+        batch_size = self.BROADCAST_BATCH_SIZE
+        
+        for start in range(0, len(connections), batch_size):
+            if start:
+                # 连接较多时每批之间让出事件循环，避免长时间阻塞其他请求
+                await asyncio.sleep(0)
+            
+            for connection in connections[start:start + batch_size]:
+                self._enqueue(connection, payload)
+    
+    def _enqueue(self, connection: Connection, payload: bytes):
+        """放入连接的发送队列"""
+        queue = connection.queue
+        if queue is None:
+            return
+        
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning(f"客户端 {connection.client_id} 发送队列已满，丢弃消息")
+    
+    async def _writer(self, connection: Connection):
+        """连接的写任务：取出当前已排队的所有消息，合并为一个JSON数组发送"""
+        websocket = connection.websocket
+        queue = connection.queue
+        try:
+            while True:
+                messages = [await queue.get()]
+                while not queue.empty():
+                    messages.append(queue.get_nowait())
+                
+                if len(messages) == 1:
+                    payload = messages[0]
+                else:
+                    payload = b'[' + b','.join(messages) + b']'
+                
+                if websocket.client_state != WebSocketState.CONNECTED:
+                    break
+                await websocket.send_bytes(payload)
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"发送消息失败: {e}")
+        
+        await self.disconnect(websocket)
+    
+    def _remove_subscriber(self, symbol: str, connection: Connection):
+        """从交易对订阅中移除连接并重建订阅者快照"""
+        subscribers = self.subscriptions.get(symbol)
+        if subscribers is None:
+            return
+        
+        subscribers.discard(connection)
+        if subscribers:
+            self._subscribers[symbol] = tuple(subscribers)
+        else:
+            del self.subscriptions[symbol]
+            self._subscribers.pop(symbol, None)
     
     async def subscribe_symbol(self, websocket: WebSocket, symbol: str):
         """订阅交易对实时数据"""
         try:
+            connection = self.connections.get(websocket)
+            if connection is None:
+                return
+            
             if symbol not in self.subscriptions:
                 self.subscriptions[symbol] = set()
             
-            self.subscriptions[symbol].add(websocket)
+            self.subscriptions[symbol].add(connection)
+            self._subscribers[symbol] = tuple(self.subscriptions[symbol])
             
             # 更新连接信息
-            if websocket in self.connection_info:
-                self.connection_info[websocket]['subscriptions'].add(symbol)
+            connection.subscriptions.add(symbol)
             
             await self.send_personal_message({
                 'type': 'subscription',
                 'action': 'subscribed',
                 'symbol': symbol,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': self._now_iso
             }, websocket)
             
-            logger.info(f"客户端订阅 {symbol}: {self.connection_info[websocket]['client_id']}")
+            logger.info(f"客户端订阅 {symbol}: {connection.client_id}")
             
         except Exception as e:
             logger.error(f"订阅失败: {e}")
@@ -144,31 +391,79 @@ class WebSocketManager:
     async def unsubscribe_symbol(self, websocket: WebSocket, symbol: str):
         """取消订阅交易对"""
         try:
-            if symbol in self.subscriptions:
-                self.subscriptions[symbol].discard(websocket)
-                if not self.subscriptions[symbol]:
-                    del self.subscriptions[symbol]
+            connection = self.connections.get(websocket)
+            if connection is None:
+                return
+            
+            self._remove_subscriber(symbol, connection)
             
             # 更新连接信息
-            if websocket in self.connection_info:
-                self.connection_info[websocket]['subscriptions'].discard(symbol)
+            connection.subscriptions.discard(symbol)
             
             await self.send_personal_message({
                 'type': 'subscription',
                 'action': 'unsubscribed',
                 'symbol': symbol,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': self._now_iso
             }, websocket)
             
-            logger.info(f"客户端取消订阅 {symbol}: {self.connection_info[websocket]['client_id']}")
+            logger.info(f"客户端取消订阅 {symbol}: {connection.client_id}")
             
         except Exception as e:
             logger.error(f"取消订阅失败: {e}")
     
-    async def handle_message(self, websocket: WebSocket, message: str):
+    async def receive_batches(self, websocket: WebSocket) -> AsyncIterator[List[Union[str, bytes]]]:
+        """
+        按批读取客户端消息：等待第一条消息，再取走处理期间已到达的所有消息
+
+        Args:
+            websocket: 客户端连接
+
+        Returns:
+            异步迭代器，每次产出一批消息，客户端断开后结束
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.RECEIVE_QUEUE_SIZE)
+        reader = asyncio.create_task(self._reader(websocket, queue))
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                batch = [message]
+                while not queue.empty():
+                    message = queue.get_nowait()
+                    if message is None:
+                        yield batch
+                        return
+                    batch.append(message)
+                yield batch
+        finally:
+            reader.cancel()
+    
+    async def _reader(self, websocket: WebSocket, queue: asyncio.Queue):
+        """连接的读任务：持续接收消息放入队列，断开时放入None"""
+        try:
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                data = message.get('text')
+                await queue.put(data if data is not None else message.get('bytes'))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"接收消息失败: {e}")
+        await queue.put(None)
+    
+    async def handle_messages(self, websocket: WebSocket, messages: Sequence[Union[str, bytes]]):
+        """依次处理一批客户端消息（回复进入发送队列，由写任务合并发送）"""
+        for message in messages:
+            await self.handle_message(websocket, message)
+    
+    async def handle_message(self, websocket: WebSocket, message: Union[str, bytes]):
         """处理客户端消息"""
         try:
-            data = json.loads(message)
+            data = _loads(message)
             message_type = data.get('type')
             
             if message_type == 'subscribe':
@@ -184,7 +479,7 @@ class WebSocketManager:
             elif message_type == 'ping':
                 await self.send_personal_message({
                     'type': 'pong',
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': self._now_iso
                 }, websocket)
                 
             elif message_type == 'get_status':
@@ -194,35 +489,35 @@ class WebSocketManager:
                 await self.send_personal_message({
                     'type': 'error',
                     'message': f'Unknown message type: {message_type}',
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': self._now_iso
                 }, websocket)
                 
         except json.JSONDecodeError:
             await self.send_personal_message({
                 'type': 'error',
                 'message': 'Invalid JSON format',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': self._now_iso
             }, websocket)
         except Exception as e:
             logger.error(f"处理客户端消息失败: {e}")
             await self.send_personal_message({
                 'type': 'error',
                 'message': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': self._now_iso
             }, websocket)
     
     async def send_status(self, websocket: WebSocket):
         """发送连接状态信息"""
         try:
-            client_info = self.connection_info.get(websocket, {})
+            connection = self.connections.get(websocket)
             status = {
                 'type': 'status',
-                'client_id': client_info.get('client_id'),
-                'connected_at': client_info.get('connected_at', datetime.now()).isoformat(),
-                'subscriptions': list(client_info.get('subscriptions', set())),
-                'total_connections': len(self.active_connections),
+                'client_id': connection.client_id if connection else None,
+                'connected_at': (connection.connected_at if connection else datetime.now()).isoformat(),
+                'subscriptions': list(connection.subscriptions) if connection else [],
+                'total_connections': len(self.connections),
                 'active_subscriptions': len(self.subscriptions),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': self._now_iso
             }
             
             await self.send_personal_message(status, websocket)
@@ -236,9 +531,17 @@ class WebSocketManager:
             'type': 'price_update',
             'symbol': symbol,
             'data': price_data,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self._now_iso
         }
         
+        # 只推送最新一笔的指标，而非重新计算整段序列
+        if self.indicator_engine is not None and 'price' in price_data:
+            indicators = self.indicator_engine.push_tick(
+                symbol, float(price_data['price']), price_data.get('open_time')
+            )
+            indicators.pop('price', None)
+            message['indicators'] = indicators
+        
         await self.broadcast_to_symbol(symbol, message)
     
     async def send_signal_update(self, symbol: str, signal_data: dict):
@@ -247,7 +550,7 @@ class WebSocketManager:
             'type': 'signal_update',
             'symbol': symbol,
             'data': signal_data,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self._now_iso
         }
         
         await self.broadcast_to_symbol(symbol, message)
@@ -257,7 +560,7 @@ class WebSocketManager:
         message = {
             'type': 'market_update',
             'data': market_data,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self._now_iso
         }
         
         await self.broadcast(message)
@@ -265,7 +568,7 @@ class WebSocketManager:
     def get_connection_stats(self) -> dict:
         """获取连接统计信息"""
         return {
-            'total_connections': len(self.active_connections),
+            'total_connections': len(self.connections),
             'active_subscriptions': len(self.subscriptions),
             'subscriptions_detail': {
                 symbol: len(connections) 
@@ -277,19 +580,31 @@ class WebSocketManager:
     async def close_all(self):
         """关闭所有连接"""
         try:
+            # 停止所有写任务
+            for connection in self.connections.values():
+                connection.queue = None
+                if connection.writer is not None:
+                    connection.writer.cancel()
+                    connection.writer = None
+            
+            results = await asyncio.gather(
+                *(websocket.close() for websocket in self.connections),
+                return_exceptions=True
+            )
             disconnected_count = 0
-            for websocket in self.active_connections.copy():
-                try:
-                    await websocket.close()
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"关闭WebSocket连接失败: {result}")
+                else:
                     disconnected_count += 1
-                except Exception as e:
-                    logger.error(f"关闭WebSocket连接失败: {e}")
             
             # 清理所有数据
-            self.active_connections.clear()
+            self.connections.clear()
             self.subscriptions.clear()
-            self.connection_info.clear()
+            self._subscribers.clear()
             self.is_running = False
+            self._stop_clock()
+            await self.stop_backplane()
             
             logger.info(f"已关闭 {disconnected_count} 个WebSocket连接")
             
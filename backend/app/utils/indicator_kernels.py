@@ -0,0 +1,293 @@
+"""
+技术指标计算内核
+基于Numba编译的递推实现，计算结果与ta库保持一致
+"""
+
+import numpy as np
+
+try:
+    from numba import config as numba_config, njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba为可选依赖，未安装时由调用方退回ta库
+    njit = None
+    prange = range
+    NUMBA_AVAILABLE = False
+
+def configure_threading_layer(priority):
+    """
+    设置并行内核的线程层优先级（需在首次调用并行内核前设置，由应用启动时调用）
+
+    并行内核会在工作线程中启动，tbb线程层在这种情况下进程退出时可能挂起，建议优先使用omp
+    """
+    if NUMBA_AVAILABLE:
+        numba_config.THREADING_LAYER_PRIORITY = list(priority)
+
+def _jit(func):
+    """numba可用时编译函数（释放GIL，可在线程中与事件循环并行），否则原样返回"""
+    if NUMBA_AVAILABLE:
+        return njit(cache=True, nogil=True)(func)
+    return func
+
+def _jit_parallel(func):
+    """numba可用时编译为多线程并行函数（prange循环分配到多个核心），否则原样返回"""
+    if NUMBA_AVAILABLE:
+        return njit(cache=True, nogil=True, parallel=True)(func)
+    return func
+
+@_jit
+def _ema_inplace(values, alpha, start, out):
+    """从start位置开始计算EMA（以首个值为初始值，等价于pandas ewm(adjust=False)）"""
+    out[start] = values[start]
+    for i in range(start + 1, values.shape[0]):
+        out[i] = alpha * values[i] + (1.0 - alpha) * out[i - 1]
+
+@_jit
+def macd(closes, fast, slow, signal):
+    """
+    计算MACD
+
+    Args:
+        closes: 收盘价数组（float64）
+        fast: 快线周期
+        slow: 慢线周期
+        signal: 信号线周期
+
+    Returns:
+        (macd, signal, histogram) 三个数组，数据不足的位置为0
+    """
+    n = closes.shape[0]
+    macd_line = np.zeros(n)
+    signal_line = np.zeros(n)
+    histogram = np.zeros(n)
+    if n < slow:
+        return macd_line, signal_line, histogram
+
+    ema_fast = np.empty(n)
+    ema_slow = np.empty(n)
+    _ema_inplace(closes, 2.0 / (fast + 1), 0, ema_fast)
+    _ema_inplace(closes, 2.0 / (slow + 1), 0, ema_slow)
+
+    # 慢线满足周期后MACD才有效
+    first = slow - 1
+    for i in range(first, n):
+        macd_line[i] = ema_fast[i] - ema_slow[i]
+
+    ema_signal = np.empty(n)
+    _ema_inplace(macd_line, 2.0 / (signal + 1), first, ema_signal)
+    for i in range(first + signal - 1, n):
+        signal_line[i] = ema_signal[i]
+        histogram[i] = macd_line[i] - ema_signal[i]
+
+    return macd_line, signal_line, histogram
+
+@_jit
+def rsi(closes, period):
+    """
+    计算RSI（涨跌幅按1/period递推平滑，每个样本O(1)）
+
+    Args:
+        closes: 收盘价数组（float64）
+        period: RSI周期
+
+    Returns:
+        RSI数组，数据不足的位置为50
+    """
+    n = closes.shape[0]
+    out = np.full(n, 50.0)
+    alpha = 1.0 / period
+    avg_gain = 0.0
+    avg_loss = 0.0
+
+    for i in range(n):
+        # 首个差分记为0，与ta库一致
+        if i > 0:
+            diff = closes[i] - closes[i - 1]
+            gain = diff if diff > 0 else 0.0
+            loss = -diff if diff < 0 else 0.0
+            avg_gain = alpha * gain + (1.0 - alpha) * avg_gain
+            avg_loss = alpha * loss + (1.0 - alpha) * avg_loss
+        if i >= period - 1:
+            if avg_loss == 0:
+                out[i] = 100.0
+            else:
+                out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    return out
+
+# 滑动窗口统计量每隔该步数从窗口重新计算一次，避免长序列累积舍入误差
+RESYNC_INTERVAL = 65536
+
+@_jit
+def _window_stats(closes, end, window):
+    """直接计算窗口[end-window+1, end]的均值和平方差和"""
+    mean = 0.0
+    for j in range(end - window + 1, end + 1):
+        mean += closes[j]
+    mean /= window
+    m2 = 0.0
+    for j in range(end - window + 1, end + 1):
+        m2 += (closes[j] - mean) ** 2
+    return mean, m2
+
+@_jit
+def bollinger_bands(closes, window, k):
+    """
+    计算布林带（滑动窗口Welford算法，每个样本O(1)）
+
+    Args:
+        closes: 收盘价数组（float64）
+        window: 计算周期
+        k: 标准差倍数
+
+    Returns:
+        (upper, middle, lower, width) 四个数组，数据不足的位置为0
+    """
+    n = closes.shape[0]
+    upper = np.zeros(n)
+    middle = np.zeros(n)
+    lower = np.zeros(n)
+    width = np.zeros(n)
+    mean = 0.0
+    m2 = 0.0
+
+    for i in range(n):
+        x = closes[i]
+        if i < window:
+            delta = x - mean
+            mean += delta / (i + 1)
+            m2 += delta * (x - mean)
+        elif i % RESYNC_INTERVAL == 0:
+            mean, m2 = _window_stats(closes, i, window)
+        else:
+            oldest = closes[i - window]
+            new_mean = mean + (x - oldest) / window
+            m2 += (x - oldest) * (x - new_mean + oldest - mean)
+            mean = new_mean
+
+        if i >= window - 1:
+            # 总体标准差（ddof=0），与ta库一致
+            std = np.sqrt(max(m2 / window, 0.0))
+            upper[i] = mean + k * std
+            middle[i] = mean
+            lower[i] = mean - k * std
+            if mean > 0:
+                width[i] = (upper[i] - lower[i]) / mean * 100
+
+    return upper, middle, lower, width
+
+# compute_all输出的列顺序
+ALL_COLUMNS = ('macd', 'macd_signal', 'macd_histogram', 'rsi',
+               'bb_upper', 'bb_middle', 'bb_lower', 'bb_width')
+
+@_jit
+def _compute_all_into(closes, fast, slow, signal, rsi_period, bb_period, bb_k, out):
+    """compute_all的实现，结果写入预先分配为0的out"""
+    n = closes.shape[0]
+
+    alpha_fast = 2.0 / (fast + 1)
+    alpha_slow = 2.0 / (slow + 1)
+    alpha_signal = 2.0 / (signal + 1)
+    alpha_rsi = 1.0 / rsi_period
+
+    ema_fast = ema_slow = ema_signal = 0.0
+    avg_gain = avg_loss = 0.0
+    bb_mean = bb_m2 = 0.0
+
+    for i in range(n):
+        x = closes[i]
+
+        # MACD：以首个值为EMA初始值
+        if i == 0:
+            ema_fast = x
+            ema_slow = x
+        else:
+            ema_fast = alpha_fast * x + (1.0 - alpha_fast) * ema_fast
+            ema_slow = alpha_slow * x + (1.0 - alpha_slow) * ema_slow
+        if i >= slow - 1:
+            macd_value = ema_fast - ema_slow
+            if i == slow - 1:
+                ema_signal = macd_value
+            else:
+                ema_signal = alpha_signal * macd_value + (1.0 - alpha_signal) * ema_signal
+            out[i, 0] = macd_value
+            if i >= slow + signal - 2:
+                out[i, 1] = ema_signal
+                out[i, 2] = macd_value - ema_signal
+
+        # RSI：首个差分记为0，涨跌幅按1/period平滑
+        if i > 0:
+            diff = x - closes[i - 1]
+            gain = diff if diff > 0 else 0.0
+            loss = -diff if diff < 0 else 0.0
+            avg_gain = alpha_rsi * gain + (1.0 - alpha_rsi) * avg_gain
+            avg_loss = alpha_rsi * loss + (1.0 - alpha_rsi) * avg_loss
+        if i >= rsi_period - 1:
+            if avg_loss == 0:
+                out[i, 3] = 100.0
+            else:
+                out[i, 3] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        else:
+            out[i, 3] = 50.0
+
+        # 布林带：滑动窗口Welford算法维护均值和平方差和
+        if i < bb_period:
+            delta = x - bb_mean
+            bb_mean += delta / (i + 1)
+            bb_m2 += delta * (x - bb_mean)
+        elif i % RESYNC_INTERVAL == 0:
+            bb_mean, bb_m2 = _window_stats(closes, i, bb_period)
+        else:
+            oldest = closes[i - bb_period]
+            new_mean = bb_mean + (x - oldest) / bb_period
+            bb_m2 += (x - oldest) * (x - new_mean + oldest - bb_mean)
+            bb_mean = new_mean
+        if i >= bb_period - 1:
+            std = np.sqrt(max(bb_m2 / bb_period, 0.0))
+            upper = bb_mean + bb_k * std
+            lower = bb_mean - bb_k * std
+            out[i, 4] = upper
+            out[i, 5] = bb_mean
+            out[i, 6] = lower
+            if bb_mean > 0:
+                out[i, 7] = (upper - lower) / bb_mean * 100
+
+@_jit
+def compute_all(closes, fast, slow, signal, rsi_period, bb_period, bb_k):
+    """
+    单次遍历同时计算MACD、RSI和布林带
+
+    Args:
+        closes: 收盘价数组（float64）
+        fast: MACD快线周期
+        slow: MACD慢线周期
+        signal: MACD信号线周期
+        rsi_period: RSI周期
+        bb_period: 布林带周期
+        bb_k: 布林带标准差倍数
+
+    Returns:
+        形状为(n, 8)的数组，列顺序见ALL_COLUMNS；数据不足的位置MACD/布林带为0、RSI为50
+    """
+    out = np.zeros((closes.shape[0], 8))
+    _compute_all_into(closes, fast, slow, signal, rsi_period, bb_period, bb_k, out)
+    return out
+
+@_jit_parallel
+def compute_all_batch(closes, lengths, fast, slow, signal, rsi_period, bb_period, bb_k):
+    """
+    并行计算多个交易对的全部指标（每个交易对相互独立）
+
+    Args:
+        closes: 形状为(交易对数, 最大长度)的收盘价矩阵，每行前lengths[s]个为有效数据
+        lengths: 每个交易对的有效数据长度
+        其余参数同compute_all
+
+    Returns:
+        形状为(交易对数, 最大长度, 8)的数组，每行前lengths[s]个有效
+    """
+    out = np.zeros((closes.shape[0], closes.shape[1], 8))
+    for s in prange(closes.shape[0]):
+        length = lengths[s]
+        _compute_all_into(closes[s, :length], fast, slow, signal, rsi_period, bb_period, bb_k,
+                          out[s, :length])
+    return out
@@ -3,77 +3,142 @@
 支持HTTP和SOCKS代理
 """
 
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 from urllib.parse import urlparse
 import aiohttp
 from aiohttp_socks import ProxyConnector
 
+from ..core.config import get_settings
+
 logger = logging.getLogger(__name__)
 
 class ProxyManager:
     """代理管理器"""
 
+    # 连接池总上限和每个主机的最大并发连接数
+    CONNECTION_LIMIT = 100
+    LIMIT_PER_HOST = 32
+    # 空闲连接保活时间（秒），期间的请求复用连接，无需重新TLS握手
+    KEEPALIVE_TIMEOUT = 60
+    # 会话默认的请求总超时（秒）
+    REQUEST_TIMEOUT = 10
+
     def __init__(self, proxy_url: Optional[str] = None):
         self.proxy_url = proxy_url
-        self.connector: Optional[aiohttp.BaseConnector] = None
+        # 代理类型（http/socks），未配置或不支持时为None
+        self._scheme: Optional[str] = None
+        # 代理配置在初始化时解析一次，之后直接复用
+        self._proxy_config: Dict[str, Any] = {}
+        # 共享的会话，首次使用时创建，复用连接池（keep-alive）和TLS会话
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
 
         if proxy_url:
             self._setup_proxy()
 
     def _setup_proxy(self):
-        """设置代理连接器"""
+        """解析代理配置（连接器随会话创建）"""
         try:
             parsed_url = urlparse(self.proxy_url)
             scheme = parsed_url.scheme.lower()
 
             if scheme in ['http', 'https']:
                 # HTTP代理
-                self.connector = aiohttp.TCPConnector()
+                self._scheme = 'http'
+                self._proxy_config = {'proxy': self.proxy_url}
                 logger.info(f"HTTP proxy configured: {self.proxy_url}")
 
             elif scheme in ['socks4', 'socks5']:
                 # SOCKS代理
-                self.connector = ProxyConnector.from_url(self.proxy_url)
+                self._scheme = 'socks'
                 logger.info(f"SOCKS proxy configured: {self.proxy_url}")
 
             else:
                 logger.warning(f"Unsupported proxy scheme: {scheme}")
-                self.connector = None
 
         except Exception as e:
             logger.error(f"Failed to setup proxy: {e}")
-            self.connector = None
+            self._scheme = None
+            self._proxy_config = {}
+
+    def _connector_options(self) -> Dict[str, Any]:
+        """连接器的连接数限制和keep-alive参数"""
+        return {
+            'limit': self.CONNECTION_LIMIT,
+            'limit_per_host': self.LIMIT_PER_HOST,
+            'keepalive_timeout': self.KEEPALIVE_TIMEOUT,
+            'enable_cleanup_closed': True
+        }
+
+    def create_connector(self) -> aiohttp.BaseConnector:
+        """创建新的连接器（SOCKS代理使用ProxyConnector，其余使用TCPConnector），需在事件循环中调用"""
+        if self._scheme == 'socks':
+            return ProxyConnector.from_url(self.proxy_url, **self._connector_options())
+        return aiohttp.TCPConnector(**self._connector_options())
 
     def get_connector(self) -> Optional[aiohttp.BaseConnector]:
-        """获取连接器"""
-        return self.connector
+        """获取共享会话使用的连接器（会话尚未创建时为None）"""
+        if self._session is None or self._session.closed:
+            return None
+        return self._session.connector
 
     def get_proxy_config(self) -> Dict[str, Any]:
-        """获取代理配置"""
-        if not self.proxy_url:
-            return {}
-
-        parsed_url = urlparse(self.proxy_url)
-        scheme = parsed_url.scheme.lower()
-
-        if scheme in ['http', 'https']:
-            return {
-                'proxy': self.proxy_url,
-                'connector': self.connector
-            }
-        elif scheme in ['socks4', 'socks5']:
-            return {
-                'connector': self.connector
-            }
-
-        return {}
+        """获取代理配置（共享的缓存字典，不应修改）"""
+        return self._proxy_config
 
     def is_enabled(self) -> bool:
         """检查代理是否启用"""
-        return self.proxy_url is not None and self.connector is not None
-
-    def create_session(self) -> aiohttp.ClientSession:
-        """创建带代理的aiohttp会话"""
-        proxy_config = self.get_proxy_config()
-        return aiohttp.ClientSession(**proxy_config)
+        return self._scheme is not None
+
+    def create_session(self, headers: Optional[Dict[str, str]] = None) -> aiohttp.ClientSession:
+        """创建带代理的aiohttp会话（会话持有自己的连接器，关闭会话时一并关闭）"""
+        return aiohttp.ClientSession(
+            headers=headers,
+            connector=self.create_connector(),
+            trust_env=False,
+            timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT),
+            **self._proxy_config
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        获取共享的aiohttp会话（首次调用时创建）
+
+        会话由所有调用方共用，请求头应在每次请求时传入；调用方不应关闭会话，
+        进程退出时由应用生命周期调用close()关闭
+
+        Returns:
+            共享的ClientSession
+        """
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    self._session = self.create_session()
+        return self._session
+
+    async def close(self):
+        """关闭共享会话（仅在应用关闭时调用）"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+# 进程内共享的代理管理器
+_proxy_manager: Optional[ProxyManager] = None
+
+def get_proxy_manager() -> ProxyManager:
+    """获取进程内共享的代理管理器（按配置的代理URL创建）"""
+    global _proxy_manager
+    if _proxy_manager is None:
+        _proxy_manager = ProxyManager(get_settings().proxy_url)
+    return _proxy_manager
+
+async def get_proxy_session() -> aiohttp.ClientSession:
+    """
+    获取进程内共享的aiohttp会话（请求头按请求传入；调用方不应关闭，应用关闭时由get_proxy_manager().close()关闭）
+
+    Returns:
+        共享的ClientSession
+    """
+    return await get_proxy_manager().get_session()
@@ -0,0 +1,54 @@
+"""
+限流器
+基于请求权重的令牌桶，配合币安的权重配额使用
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class WeightedTokenBucket:
+    """按权重消耗令牌的令牌桶限流器"""
+
+    def __init__(self, capacity: int = 1200, refill_per_s: float = 20.0):
+        self.capacity = capacity
+        self.refill_per_s = refill_per_s
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """按流逝时间补充令牌"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_s)
+        self._updated = now
+
+    async def acquire(self, weight: int = 1):
+        """获取指定权重的令牌，不足时等待"""
+        async with self._lock:
+            while True:
+                wait = self._blocked_until - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+
+                await asyncio.sleep((weight - self._tokens) / self.refill_per_s)
+
+    def update_used_weight(self, used_weight: int):
+        """根据服务端返回的已用权重校正本地令牌数（只会更保守）"""
+        self._refill()
+        self._tokens = min(self._tokens, max(0.0, self.capacity - used_weight))
+
+    def block_for(self, seconds: float):
+        """在指定时间内暂停发放令牌（用于429/418退避）"""
+        self._tokens = 0.0
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        logger.warning(f"Rate limit hit, backing off for {seconds}s")
@@ -0,0 +1,75 @@
+"""
+静态文件服务
+支持缓存头和预压缩文件（.br/.gz）
+"""
+
+import mimetypes
+import os
+from typing import Union
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# 预压缩文件的内容编码和后缀，按优先级排列
+PRECOMPRESSED_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+# 构建产物中带内容哈希的资源目录（vite默认输出到assets/），内容变化时文件名随之变化
+FINGERPRINTED_DIRS = ("assets/",)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 其余文件（如index.html）每次通过ETag/Last-Modified校验
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+class CachedStaticFiles(StaticFiles):
+    """带缓存头的静态文件服务，客户端支持时返回预先压缩好的.br/.gz文件"""
+
+    def file_response(
+        self,
+        full_path: Union[str, "os.PathLike[str]"],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        method = scope["method"]
+        request_headers = Headers(scope=scope)
+        accept_encoding = request_headers.get("accept-encoding", "")
+
+        response = None
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+            if encoding not in accept_encoding:
+                continue
+            compressed_path = f"{full_path}{suffix}"
+            try:
+                compressed_stat = os.stat(compressed_path)
+            except OSError:
+                continue
+            # Content-Type按原文件推断，压缩文件本身的ETag用于缓存校验
+            response = FileResponse(
+                compressed_path,
+                status_code=status_code,
+                stat_result=compressed_stat,
+                method=method,
+                media_type=mimetypes.guess_type(str(full_path))[0] or "text/plain",
+                headers={"content-encoding": encoding, "vary": "Accept-Encoding"},
+            )
+            break
+
+        if response is None:
+            response = FileResponse(
+                full_path, status_code=status_code, stat_result=stat_result, method=method
+            )
+
+        response.headers["cache-control"] = self._cache_control(scope)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    @staticmethod
+    def _cache_control(scope: Scope) -> str:
+        """带内容哈希的资源长期缓存，其余文件每次校验"""
+        path = scope["path"].lstrip("/")
+        if path.startswith(FINGERPRINTED_DIRS):
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
@@ -0,0 +1,127 @@
+"""
+周期任务调度
+所有周期性任务共用一个定时循环，事件循环的定时器堆中最多只有一个定时器
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class _Job:
+    """已注册的周期任务"""
+
+    __slots__ = ('handler', 'is_coroutine', 'every', 'next_due', 'task')
+
+    def __init__(self, handler: Callable[[], Any], every: float, next_due: float):
+        self.handler = handler
+        self.is_coroutine = asyncio.iscoroutinefunction(handler)
+        self.every = every
+        # 下次执行的事件循环时间
+        self.next_due = next_due
+        # 协程任务上一次运行的Task，未结束时跳过本次调度
+        self.task: Optional[asyncio.Task] = None
+
+class Ticker:
+    """
+    单一定时循环：每次休眠到最早到期的任务，执行所有到期任务
+
+    没有任务时循环挂起，不设置任何定时器；只有长周期任务时按其周期唤醒
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, _Job] = {}
+        self._task: Optional[asyncio.Task] = None
+        # 循环休眠时等待的Future，任务变化时提前唤醒以重新计算休眠时间
+        self._waiter: Optional[asyncio.Future] = None
+
+    def register(self, name: str, handler: Callable[[], Any], every: float):
+        """
+        注册周期任务（同名任务会被替换），注册后立即执行一次
+
+        Args:
+            name: 任务名称
+            handler: 无参回调，可以是普通函数或协程函数；协程在单独的Task中运行，上一次未结束时跳过
+            every: 执行间隔（秒）
+        """
+        self.unregister(name)
+        self._jobs[name] = _Job(handler, every, asyncio.get_running_loop().time())
+        self._wake()
+
+    def unregister(self, name: str):
+        """移除周期任务并取消其正在运行的Task"""
+        job = self._jobs.pop(name, None)
+        if job is None:
+            return
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        self._wake()
+
+    def is_registered(self, name: str) -> bool:
+        """检查任务是否已注册"""
+        return name in self._jobs
+
+    def start(self):
+        """启动定时循环（需在事件循环中调用，重复调用无副作用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止定时循环并取消所有任务"""
+        for name in tuple(self._jobs):
+            self.unregister(name)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _wake(self):
+        """唤醒休眠中的循环"""
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def _run(self):
+        """定时循环：执行到期任务，然后休眠到下一个任务到期或任务变化"""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            next_due = None
+            for job in tuple(self._jobs.values()):
+                if now >= job.next_due:
+                    # 落后超过一个周期时不补执行，从当前时间重新计时
+                    job.next_due += job.every
+                    if job.next_due <= now:
+                        job.next_due = now + job.every
+                    self._dispatch(job)
+                if next_due is None or job.next_due < next_due:
+                    next_due = job.next_due
+
+            self._waiter = loop.create_future()
+            timer = None
+            if next_due is not None:
+                timer = loop.call_at(next_due, self._wake)
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+                if timer is not None:
+                    timer.cancel()
+
+    @staticmethod
+    def _dispatch(job: _Job):
+        """执行任务：普通函数直接调用，协程函数创建Task"""
+        try:
+            if job.is_coroutine:
+                if job.task is None or job.task.done():
+                    job.task = asyncio.create_task(job.handler())
+            else:
+                job.handler()
+        except Exception as e:
+            logger.error(f"周期任务执行失败: {e}")
+
+# 全局定时循环实例
+ticker = Ticker()
@@ -0,0 +1,67 @@
+"""
+多进程互斥锁
+基于文件锁在同一台机器的多个工作进程中选出唯一的持有者，进程退出时由操作系统自动释放
+"""
+
+import logging
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+class WorkerLock:
+    """非阻塞的进程间文件锁"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        """本进程是否持有锁"""
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """尝试获取锁（不等待），已持有时直接返回True"""
+        if self._fd is not None:
+            return True
+
+        lock_dir = os.path.dirname(self.path)
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        logger.info(f"Acquired worker lock {self.path} (pid {os.getpid()})")
+        return True
+
+    def release(self):
+        """释放锁"""
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        except OSError as e:
+            logger.warning(f"Failed to release worker lock {self.path}: {e}")
+        finally:
+            os.close(self._fd)
+            self._fd = None
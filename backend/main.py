@@ -3,21 +3,30 @@ CryptoQuantBot - 加密货币量化交易应用主程序
 """
 
 import asyncio
+import importlib.util
 import logging
+import os
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, Response
+import orjson
 import uvicorn
 
-from app.core.config import get_settings
+from app.core.config import get_settings, detect_api_mode, worker_count
 from app.core.database import init_database
 from app.api import market, strategy, backtest, trading
 from app.services.websocket_manager import websocket_manager
 from app.services.market_data import MarketDataService
 from app.services.strategy_engine import StrategyEngine
 from app.services.backtest_engine import BacktestEngine
+from app.utils.indicator_kernels import configure_threading_layer
+from app.utils.static_files import CachedStaticFiles
+from app.utils.ticker import ticker
+from app.utils.worker_lock import WorkerLock
+from app.utils.proxy import get_proxy_manager
 
 # 配置日志
 logging.basicConfig(
@@ -26,11 +35,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 配置在进程运行期间不变，导入时读取一次
+_SETTINGS = get_settings()
+_API_MODE = detect_api_mode()
+
+# 系统状态响应缓存的有效期（秒），轮询时复用已序列化的响应体
+STATUS_CACHE_TTL = 0.5
+_status_cache = {"t": 0.0, "body": None}
+
+# 多进程时只有持有该锁的进程接收行情推送/轮询并写入数据库，锁文件与数据库放在同一目录
+INGESTION_LOCK_FILE = "ingestion.lock"
+# 未持有锁的进程定期尝试接管（持有锁的进程退出后）
+INGESTION_TAKEOVER_JOB = "ingestion_takeover"
+INGESTION_TAKEOVER_INTERVAL = 30
+_ingestion_lock = WorkerLock(
+    os.path.join(os.path.dirname(_SETTINGS.sqlite_path) or ".", INGESTION_LOCK_FILE)
+)
+
 # 全局服务实例
 market_service: MarketDataService = None
 strategy_engine: StrategyEngine = None
 backtest_engine: BacktestEngine = None
 
+async def _init_step(name: str, coro):
+    """执行一个启动步骤，单独记录成功或失败"""
+    try:
+        await coro
+        logger.info(f"✅ {name}")
+    except Exception as e:
+        logger.error(f"❌ {name} failed: {e}")
+        raise
+
+async def _start_ingestion():
+    """启动实时数据更新：多进程时只在持有行情锁的进程中运行，避免重复订阅和并发写库"""
+    if worker_count() == 1 or _ingestion_lock.try_acquire():
+        await market_service.start_real_time_data()
+        return
+
+    logger.info("Real-time data is handled by another worker")
+    ticker.register(INGESTION_TAKEOVER_JOB, _take_over_ingestion, every=INGESTION_TAKEOVER_INTERVAL)
+    ticker.start()
+
+async def _take_over_ingestion():
+    """持有行情锁的进程退出后接管实时数据更新"""
+    if not _ingestion_lock.try_acquire():
+        return
+    logger.info("Taking over real-time data updates")
+    await market_service.start_real_time_data()
+    ticker.unregister(INGESTION_TAKEOVER_JOB)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
@@ -38,33 +91,37 @@ async def lifespan(app: FastAPI):
 
     # 启动时初始化
     logger.info("🚀 Starting CryptoQuantBot...")
+    logger.info(f"Event loop: {type(asyncio.get_running_loop()).__module__}")
+    configure_threading_layer(_SETTINGS.numba_threading_layer_priority)
 
     try:
-        # 初始化数据库
-        await init_database()
-        logger.info("✅ Database initialized")
-
-        # 初始化市场数据服务
         market_service = MarketDataService()
-        await market_service.initialize()
-        logger.info("✅ Market data service initialized")
-
-        # 初始化策略引擎
         strategy_engine = StrategyEngine()
-        await strategy_engine.initialize(market_service)
-        logger.info("✅ Strategy engine initialized")
-
-        # 初始化回测引擎
         backtest_engine = BacktestEngine()
-        await backtest_engine.initialize(market_service, strategy_engine)
-        logger.info("✅ Backtest engine initialized")
 
-        # 启动实时数据更新
-        await market_service.start_real_time_data()
-        logger.info("✅ Real-time data updates started")
-
-        # 启动WebSocket管理器
-        websocket_manager.is_running = True
+        # 数据库与行情服务（连接币安）相互独立，并行初始化
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(_init_step("Database initialized", init_database()))
+            tg.create_task(_init_step("Market data service initialized", market_service.initialize()))
+
+        # 策略引擎依赖行情服务，实时数据依赖数据库和行情服务，两者之间相互独立
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(_init_step(
+                "Strategy engine initialized", strategy_engine.initialize(market_service)
+            ))
+            tg.create_task(_init_step("Real-time data updates started", _start_ingestion()))
+
+        # 回测引擎依赖行情服务和策略引擎，在前置步骤全部完成后初始化
+        await _init_step(
+            "Backtest engine initialized", backtest_engine.initialize(market_service, strategy_engine)
+        )
+
+        # 启动WebSocket管理器（价格推送复用策略引擎的指标引擎）
+        websocket_manager.indicator_engine = strategy_engine.indicator_engine
+        websocket_manager.start()
+        # 多进程时各进程只持有部分连接，通过Redis把广播转发到所有进程
+        if worker_count() > 1:
+            await websocket_manager.start_backplane(_SETTINGS.redis_url)
         logger.info("✅ WebSocket manager started")
 
         logger.info("🎉 CryptoQuantBot started successfully!")
@@ -83,9 +140,17 @@ async def lifespan(app: FastAPI):
         if market_service:
             await market_service.close()
 
+        _ingestion_lock.release()
+
         # 关闭WebSocket连接
         await websocket_manager.close_all()
 
+        # 停止周期任务的定时循环
+        await ticker.stop()
+
+        # 关闭进程内共享的HTTP会话
+        await get_proxy_manager().close()
+
         logger.info("✅ CryptoQuantBot shutdown complete")
 
     except Exception as e:
@@ -108,6 +173,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩较大的响应（已带Content-Encoding的预压缩静态文件不会重复压缩）
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
 # 注册API路由
 app.include_router(market.router, prefix="/api/market", tags=["市场数据"])
 app.include_router(strategy.router, prefix="/api/strategy", tags=["策略分析"])
@@ -126,21 +194,11 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket_manager.connect(websocket, client_id)
         logger.info(f"WebSocket client connected: {client_id}")
 
-        while True:
-            try:
-                # 接收客户端消息
-                message = await websocket.receive_text()
-                await websocket_manager.handle_message(websocket, message)
-
-            except WebSocketDisconnect:
-                logger.info(f"WebSocket client disconnected: {client_id}")
-                break
-            except Exception as e:
-                logger.error(f"WebSocket message handling error: {e}")
-                await websocket_manager.send_personal_message({
-                    'type': 'error',
-                    'message': str(e)
-                }, websocket)
+        # 每次取出已到达的全部消息，成批处理
+        async for messages in websocket_manager.receive_batches(websocket):
+            await websocket_manager.handle_messages(websocket, messages)
+
+        logger.info(f"WebSocket client disconnected: {client_id}")
 
     except Exception as e:
         logger.error(f"WebSocket connection error: {e}")
@@ -151,22 +209,18 @@ async def websocket_endpoint(websocket: WebSocket):
 @app.get("/")
 async def health_check():
     """健康检查"""
-    from app.core.config import detect_api_mode
-    settings = get_settings()
-    api_mode = detect_api_mode()
-
     return {
         "message": "CryptoQuantBot API is running",
         "version": "1.0.0",
         "status": "healthy",
-        "api_mode": api_mode,
-        "supported_symbols": settings.binance_symbols,
-        "default_interval": settings.binance_default_interval,
+        "api_mode": _API_MODE,
+        "supported_symbols": _SETTINGS.binance_symbols,
+        "default_interval": _SETTINGS.binance_default_interval,
         "features": {
             "market_data": True,
             "strategy_analysis": True,
             "backtesting": True,
-            "trading": api_mode == "FULL_MODE",
+            "trading": _API_MODE == "FULL_MODE",
             "real_time_data": True,
             "websocket": True
         }
@@ -185,10 +239,14 @@ async def websocket_status():
 # 系统状态端点
 @app.get("/api/system/status")
 async def system_status():
-    """获取系统状态"""
+    """获取系统状态（结果缓存STATUS_CACHE_TTL秒）"""
     global market_service, strategy_engine, backtest_engine
 
-    return {
+    now = time.monotonic()
+    if _status_cache["body"] is not None and now - _status_cache["t"] < STATUS_CACHE_TTL:
+        return Response(content=_status_cache["body"], media_type="application/json")
+
+    body = orjson.dumps({
         "system": {
             "status": "running",
             "version": "1.0.0"
@@ -201,32 +259,52 @@ async def system_status():
         },
         "websocket": websocket_manager.get_connection_stats(),
         "settings": {
-            "api_mode": get_settings().binance_api_mode,
-            "symbols": get_settings().binance_symbols,
-            "interval": get_settings().binance_default_interval
+            "api_mode": _API_MODE,
+            "symbols": _SETTINGS.binance_symbols,
+            "interval": _SETTINGS.binance_default_interval
         }
-    }
+    })
+    _status_cache["t"] = now
+    _status_cache["body"] = body
+    return Response(content=body, media_type="application/json")
 
-# 静态文件服务（生产环境）
+# 静态文件服务（生产环境），带缓存头并优先返回预压缩文件
 try:
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 except RuntimeError:
     # 开发环境下static目录可能不存在
     pass
 
+def server_impl_options() -> dict:
+    """uvicorn的事件循环、HTTP解析实现和WebSocket参数（uvloop/httptools未安装时退回纯Python实现）"""
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "ws": "websockets",
+        # 行情推送消息小而频繁：放宽单条消息上限，关闭逐条压缩
+        "ws_max_size": 16 * 1024 * 1024,
+        "ws_ping_interval": 30,
+        "ws_ping_timeout": 30,
+        "ws_per_message_deflate": False
+    }
+
 if __name__ == "__main__":
-    settings = get_settings()
-    from app.core.config import detect_api_mode
+    logger.info(f"Starting server in {_API_MODE} mode")
+    logger.info(f"Supported symbols: {_SETTINGS.binance_symbols}")
 
-    api_mode = detect_api_mode()
-    logger.info(f"Starting server in {api_mode} mode")
-    logger.info(f"Supported symbols: {settings.binance_symbols}")
+    workers = worker_count()
+    if workers > 1:
+        # 多进程时热重载不可用；WebSocket连接分布在各进程中，广播经Redis转发到所有进程；
+        # 实时行情只由一个进程接收，币安权重配额由各进程平分
+        logger.warning(f"Starting {workers} workers, reload disabled")
 
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=workers == 1,
+        workers=workers,
         log_level="info",
-        access_log=True
+        access_log=True,
+        **server_impl_options()
     )
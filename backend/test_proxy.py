@@ -10,7 +10,7 @@ import os
 # 添加项目路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.utils.proxy import ProxyManager
+from app.utils.proxy import get_proxy_manager, get_proxy_session
 from app.core.config import get_settings
 import logging
 
@@ -30,22 +30,23 @@ async def test_proxy():
         print("请在config.yaml中设置proxy.url或在环境变量中设置PROXY_URL")
         return
 
-    # 创建代理管理器
-    proxy_manager = ProxyManager(settings.proxy_url)
+    # 进程内共享的代理管理器
+    proxy_manager = get_proxy_manager()
 
     # 测试连接器创建
     print("\n=== 测试连接器创建 ===")
-    connector = proxy_manager.create_connector()
+    connector = proxy_manager.create_connector() if proxy_manager.is_enabled() else None
     if connector:
         print("✅ 代理连接器创建成功")
         print(f"连接器类型: {type(connector).__name__}")
+        await connector.close()
     else:
         print("❌ 代理连接器创建失败")
         return
 
-    # 测试会话创建
+    # 测试会话创建（共享会话，复用连接池）
     print("\n=== 测试会话创建 ===")
-    session = proxy_manager.create_session()
+    session = await get_proxy_session()
     if session:
         print("✅ 代理会话创建成功")
     else:
@@ -67,7 +68,8 @@ async def test_proxy():
     except Exception as e:
         print(f"❌ 代理请求异常: {e}")
     finally:
-        await session.close()
+        # 共享会话只在进程退出前关闭
+        await proxy_manager.close()
 
     print("\n=== 测试完成 ===")
 
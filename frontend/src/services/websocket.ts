@@ -16,6 +16,7 @@ class WebSocketService {
   private eventListeners: Map<string, EventCallback[]> = new Map();
   private subscriptions: Set<string> = new Set();
   private connectionCallback: ((connected: boolean) => void) | null = null;
+  private decoder = new TextDecoder();
 
   constructor() {
     this.connect();
@@ -35,6 +36,8 @@ class WebSocketService {
 
     try {
       this.ws = new WebSocket(wsUrl);
+      // 后端以二进制帧发送UTF-8编码的JSON
+      this.ws.binaryType = 'arraybuffer';
       this.setupEventHandlers();
     } catch (error) {
       console.error('WebSocket connection error:', error);
@@ -64,9 +67,14 @@ class WebSocketService {
 
     this.ws.onmessage = (event) => {
       try {
-        const message: WebSocketMessage = JSON.parse(event.data);
-        console.log('WebSocket message received:', message);
-        this.handleMessage(message);
+        const text = typeof event.data === 'string' ? event.data : this.decoder.decode(event.data);
+        // 服务端会把同一时刻产生的多条消息合并为数组发送
+        const parsed: WebSocketMessage | WebSocketMessage[] = JSON.parse(text);
+        const messages = Array.isArray(parsed) ? parsed : [parsed];
+        for (const message of messages) {
+          console.log('WebSocket message received:', message);
+          this.handleMessage(message);
+        }
       } catch (error) {
         console.error('Error parsing WebSocket message:', error);
       }
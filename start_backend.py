@@ -3,15 +3,24 @@
 简化的后端启动脚本
 """
 
+import asyncio
+import functools
+import importlib.util
+import os
+import time
+import numpy as np
+import orjson
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 import uvicorn
 
 # 创建FastAPI应用
 app = FastAPI(
     title="CryptoQuantBot API",
     description="加密货币量化交易应用后端API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # 配置CORS
@@ -23,104 +32,144 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 固定内容的响应体只序列化一次
+_HEALTH_BODY = orjson.dumps({
+    "message": "CryptoQuantBot API is running",
+    "version": "1.0.0",
+    "status": "healthy",
+    "features": {
+        "market_data": True,
+        "strategy_analysis": True,
+        "backtesting": True,
+        "trading": False,
+        "real_time_data": True,
+        "websocket": True
+    }
+})
+
+_API_HEALTH_BODY = orjson.dumps({"status": "ok", "message": "API is working"})
+
+_MARKET_OVERVIEW_BODY = orjson.dumps({
+    "status": "ok",
+    "data": {
+        "total_market_cap": 2500000000000,
+        "total_volume": 50000000000,
+        "active_traders": 1500000,
+        "top_gainers": [
+            {"symbol": "BTCUSDT", "change": 2.5, "price": 45000},
+            {"symbol": "ETHUSDT", "change": 1.8, "price": 3200}
+        ]
+    }
+})
+
 # 健康检查端点
 @app.get("/")
 async def health_check():
     """健康检查"""
-    return {
-        "message": "CryptoQuantBot API is running",
-        "version": "1.0.0",
-        "status": "healthy",
-        "features": {
-            "market_data": True,
-            "strategy_analysis": True,
-            "backtesting": True,
-            "trading": False,
-            "real_time_data": True,
-            "websocket": True
-        }
-    }
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 @app.get("/api/health")
 async def api_health():
     """API健康检查"""
-    return {"status": "ok", "message": "API is working"}
+    return Response(content=_API_HEALTH_BODY, media_type="application/json")
 
 # 市场数据API端点
 @app.get("/api/market/overview")
 async def market_overview():
     """市场概览"""
-    return {
+    return Response(content=_MARKET_OVERVIEW_BODY, media_type="application/json")
+
+# 模拟价格数据
+_MOCK_PRICES = {
+    "BTCUSDT": {"price": 45000.50, "change": 2.5, "volume": 1000000},
+    "ETHUSDT": {"price": 3200.25, "change": 1.8, "volume": 500000},
+    "BNBUSDT": {"price": 350.75, "change": -0.5, "volume": 200000}
+}
+
+# 各交易对的价格响应体在导入时序列化好（价格改为动态后需要定时重建）
+_TICKER_BODIES = {
+    symbol: orjson.dumps({
         "status": "ok",
         "data": {
-            "total_market_cap": 2500000000000,
-            "total_volume": 50000000000,
-            "active_traders": 1500000,
-            "top_gainers": [
-                {"symbol": "BTCUSDT", "change": 2.5, "price": 45000},
-                {"symbol": "ETHUSDT", "change": 1.8, "price": 3200}
-            ]
+            "symbol": symbol,
+            "price": mock["price"],
+            "change_24h": mock["change"],
+            "volume_24h": mock["volume"],
+            "timestamp": 1698240000000
         }
-    }
+    })
+    for symbol, mock in _MOCK_PRICES.items()
+}
 
 @app.get("/api/market/ticker/{symbol}")
 async def get_ticker(symbol: str):
     """获取交易对价格信息"""
-    # 模拟价格数据
-    mock_prices = {
-        "BTCUSDT": {"price": 45000.50, "change": 2.5, "volume": 1000000},
-        "ETHUSDT": {"price": 3200.25, "change": 1.8, "volume": 500000},
-        "BNBUSDT": {"price": 350.75, "change": -0.5, "volume": 200000}
-    }
+    body = _TICKER_BODIES.get(symbol)
+    if body is None:
+        body = orjson.dumps({"status": "error", "message": f"Symbol {symbol} not found"})
+    return Response(content=body, media_type="application/json")
+
+# K线周期单位对应的秒数
+_INTERVAL_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800, "M": 2592000}
+
+def _interval_seconds(interval: str) -> int:
+    """K线周期对应的秒数（无法解析时按4小时计算）"""
+    try:
+        return int(interval[:-1]) * _INTERVAL_UNIT_SECONDS[interval[-1]]
+    except (KeyError, ValueError):
+        return 4 * 3600
+
+@functools.lru_cache(maxsize=256)
+def _gen_klines(symbol: str, interval: str, limit: int, bucket: int) -> tuple:
+    """生成模拟K线数据（bucket为当前所处的K线周期序号，同一周期内结果被缓存）"""
+    # 向量化生成模拟K线数据
+    rng = np.random.default_rng()
+    base_price = 45000 if symbol == "BTCUSDT" else 3200
+    current_time = int(time.time() * 1000)
+    bar_ms = 4 * 60 * 60 * 1000
     
-    if symbol in mock_prices:
-        return {
-            "status": "ok",
-            "data": {
-                "symbol": symbol,
-                "price": mock_prices[symbol]["price"],
-                "change_24h": mock_prices[symbol]["change"],
-                "volume_24h": mock_prices[symbol]["volume"],
-                "timestamp": 1698240000000
-            }
-        }
-    else:
-        return {"status": "error", "message": f"Symbol {symbol} not found"}
+    # 模拟价格波动
+    open_price = base_price * (1 + rng.uniform(-0.02, 0.02, limit))
+    close_price = open_price * (1 + rng.uniform(-0.01, 0.01, limit))
+    high_price = np.maximum(open_price, close_price) * (1 + rng.uniform(0, 0.005, limit))
+    low_price = np.minimum(open_price, close_price) * (1 - rng.uniform(0, 0.005, limit))
+    volume = rng.uniform(100, 1000, limit)
+    open_time = current_time - (limit - np.arange(limit)) * bar_ms
+    
+    # 数值保留两位小数，直接以浮点数输出，由orjson序列化
+    def fmt(values: np.ndarray) -> list:
+        return np.round(values, 2).tolist()
+    
+    quote_volume = volume * close_price
+    return tuple(
+        zip(
+            open_time.tolist(),          # 时间戳
+            fmt(open_price),             # 开盘价
+            fmt(high_price),             # 最高价
+            fmt(low_price),              # 最低价
+            fmt(close_price),            # 收盘价
+            fmt(volume),                 # 成交量
+            (open_time + bar_ms - 1).tolist(),  # 收盘时间
+            fmt(quote_volume),           # 成交额
+            [100] * limit,               # 成交笔数
+            fmt(volume * 0.5),           # 主动买入成交量
+            fmt(quote_volume * 0.5),     # 主动买入成交额
+            ["0"] * limit                # 忽略此参数
+        )
+    )
+
+def _build_klines(symbol: str, interval: str, limit: int, use_cache: bool) -> list:
+    """生成K线数据（use_cache时同一K线周期内复用缓存结果）"""
+    if use_cache:
+        bucket = int(time.time() // _interval_seconds(interval))
+        return list(_gen_klines(symbol, interval, limit, bucket))
+    return list(_gen_klines.__wrapped__(symbol, interval, limit, 0))
 
 @app.get("/api/market/klines/{symbol}")
 async def get_klines(symbol: str, interval: str = "4h", limit: int = 100, use_cache: bool = True):
     """获取K线数据"""
-    import time
-    import random
-    
-    # 生成模拟K线数据
-    klines = []
-    base_price = 45000 if symbol == "BTCUSDT" else 3200
-    current_time = int(time.time() * 1000)
-    
-    for i in range(limit):
-        # 模拟价格波动
-        price_change = random.uniform(-0.02, 0.02)
-        open_price = base_price * (1 + price_change)
-        close_price = open_price * (1 + random.uniform(-0.01, 0.01))
-        high_price = max(open_price, close_price) * (1 + random.uniform(0, 0.005))
-        low_price = min(open_price, close_price) * (1 - random.uniform(0, 0.005))
-        volume = random.uniform(100, 1000)
-        
-        klines.append([
-            current_time - (limit - i) * 4 * 60 * 60 * 1000,  # 时间戳
-            f"{open_price:.2f}",  # 开盘价
-            f"{high_price:.2f}",  # 最高价
-            f"{low_price:.2f}",   # 最低价
-            f"{close_price:.2f}", # 收盘价
-            f"{volume:.2f}",      # 成交量
-            current_time - (limit - i) * 4 * 60 * 60 * 1000 + 4 * 60 * 60 * 1000 - 1,  # 收盘时间
-            f"{volume * close_price:.2f}",  # 成交额
-            100,  # 成交笔数
-            f"{volume * 0.5:.2f}",  # 主动买入成交量
-            f"{volume * close_price * 0.5:.2f}",  # 主动买入成交额
-            "0"  # 忽略此参数
-        ])
+    # 数据生成放到线程池中执行，不阻塞事件循环上的其他请求和WebSocket
+    klines = await asyncio.to_thread(_build_klines, symbol, interval, limit, use_cache)
     
     return {
         "status": "ok",
@@ -151,15 +200,39 @@ async def websocket_endpoint():
     """WebSocket连接端点（简化版）"""
     return {"message": "WebSocket endpoint available", "note": "Full WebSocket support requires additional setup"}
 
+def worker_count() -> int:
+    """从环境变量读取uvicorn工作进程数（WEB_CONCURRENCY或UVICORN_WORKERS，默认1）"""
+    return max(1, int(os.getenv("WEB_CONCURRENCY") or os.getenv("UVICORN_WORKERS") or 1))
+
+def server_impl_options() -> dict:
+    """uvicorn的事件循环、HTTP解析实现和WebSocket参数（uvloop/httptools未安装时退回纯Python实现）"""
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "ws": "websockets",
+        # 行情推送消息小而频繁：放宽单条消息上限，关闭逐条压缩
+        "ws_max_size": 16 * 1024 * 1024,
+        "ws_ping_interval": 30,
+        "ws_ping_timeout": 30,
+        "ws_per_message_deflate": False
+    }
+
 if __name__ == "__main__":
     print("🚀 Starting CryptoQuantBot Backend...")
     print("📊 API will be available at: http://localhost:8000")
     print("📖 API docs will be available at: http://localhost:8000/docs")
     
+    workers = worker_count()
+    if workers > 1:
+        # 多进程时热重载不可用；WebSocket连接分布在各进程中，广播只覆盖本进程的客户端
+        print(f"⚙️  Starting {workers} workers, reload disabled")
+    
     uvicorn.run(
         "start_backend:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        reload=workers == 1,
+        workers=workers,
+        log_level="info",
+        **server_impl_options()
     )
@@ -3,41 +3,48 @@
 API测试脚本
 """
 
-import requests
+import asyncio
 import json
+import httpx
 
-def test_api_endpoints():
-    base_url = "http://localhost:8000"
-    
-    endpoints = [
-        "/",
-        "/api/health",
-        "/api/market/overview",
-        "/api/market/ticker/BTCUSDT",
-        "/api/market/ticker/ETHUSDT",
-        "/api/market/klines/BTCUSDT?interval=4h&limit=10"
-    ]
-    
+BASE_URL = "http://localhost:8000"
+
+ENDPOINTS = [
+    "/",
+    "/api/health",
+    "/api/market/overview",
+    "/api/market/ticker/BTCUSDT",
+    "/api/market/ticker/ETHUSDT",
+    "/api/market/klines/BTCUSDT?interval=4h&limit=10"
+]
+
+async def fetch(client: httpx.AsyncClient, endpoint: str):
+    """请求单个端点，返回响应或异常"""
+    try:
+        return await client.get(endpoint)
+    except Exception as e:
+        return e
+
+async def test_api_endpoints():
     print("🧪 测试API端点...")
     print("=" * 50)
     
-    for endpoint in endpoints:
-        try:
-            url = base_url + endpoint
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                print(f"✅ {endpoint} - 状态码: {response.status_code}")
-                data = response.json()
-                if "data" in data:
-                    print(f"   数据: {json.dumps(data['data'], indent=2)[:100]}...")
-                else:
-                    print(f"   响应: {json.dumps(data, indent=2)[:100]}...")
+    # 共用一个客户端复用连接，并发请求所有端点
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=5.0) as client:
+        responses = await asyncio.gather(*(fetch(client, endpoint) for endpoint in ENDPOINTS))
+    
+    for endpoint, response in zip(ENDPOINTS, responses):
+        if isinstance(response, Exception):
+            print(f"❌ {endpoint} - 错误: {response}")
+        elif response.status_code == 200:
+            print(f"✅ {endpoint} - 状态码: {response.status_code}")
+            data = response.json()
+            if "data" in data:
+                print(f"   数据: {json.dumps(data['data'], indent=2)[:100]}...")
             else:
-                print(f"❌ {endpoint} - 状态码: {response.status_code}")
-                
-        except Exception as e:
-            print(f"❌ {endpoint} - 错误: {e}")
+                print(f"   响应: {json.dumps(data, indent=2)[:100]}...")
+        else:
+            print(f"❌ {endpoint} - 状态码: {response.status_code}")
         
         print()
     
@@ -47,4 +54,4 @@ def test_api_endpoints():
     print("📖 API文档地址: http://localhost:8000/docs")
 
 if __name__ == "__main__":
-    test_api_endpoints()
+    asyncio.run(test_api_endpoints())
@@ -4,8 +4,19 @@ WebSocket 连接测试脚本
 """
 
 import asyncio
+import orjson
 import websockets
-import json
+
+# 发送完所有消息后等待服务端推送的时间（秒）
+RECEIVE_TIMEOUT = 15.0
+
+async def _drain(websocket):
+    """后台持续接收并打印服务端消息"""
+    count = 0
+    async for message in websocket:
+        count += 1
+        # 服务端以二进制帧发送orjson序列化的消息
+        print(f"📥 收到数据 {count}:", orjson.loads(message))
 
 async def test_websocket():
     uri = "ws://localhost:8000/ws"
@@ -16,40 +27,44 @@ async def test_websocket():
             "User-Agent": "WebSocketTest/1.0"
         }
         
-        async with websockets.connect(uri, extra_headers=extra_headers) as websocket:
+        # websockets 14起该参数改名为additional_headers
+        header_arg = "additional_headers" if int(websockets.__version__.split(".")[0]) >= 14 else "extra_headers"
+        
+        async with websockets.connect(
+            uri,
+            **{header_arg: extra_headers},
+            max_size=None,
+            compression=None,
+            ping_interval=None
+        ) as websocket:
             print("✅ WebSocket 连接成功!")
             
-            # 发送测试消息
-            test_message = {
-                "type": "ping",
-                "timestamp": "2024-01-01T00:00:00Z"
-            }
-            
-            await websocket.send(json.dumps(test_message))
-            print("📤 发送测试消息:", test_message)
-            
-            # 接收响应
-            response = await websocket.recv()
-            print("📥 收到响应:", response)
+            # 接收在后台进行，发送不必逐条等待响应
+            reader = asyncio.create_task(_drain(websocket))
             
-            # 订阅测试
-            subscribe_message = {
-                "type": "subscribe",
-                "symbol": "BTCUSDT"
-            }
+            messages = [
+                # 测试消息
+                {
+                    "type": "ping",
+                    "timestamp": "2024-01-01T00:00:00Z"
+                },
+                # 订阅测试
+                {
+                    "type": "subscribe",
+                    "symbol": "BTCUSDT"
+                }
+            ]
             
-            await websocket.send(json.dumps(subscribe_message))
-            print("📤 发送订阅消息:", subscribe_message)
+            await asyncio.gather(*(websocket.send(orjson.dumps(message)) for message in messages))
+            for message in messages:
+                print("📤 发送消息:", message)
             
             # 等待一段时间接收数据
             print("⏳ 等待实时数据...")
-            for i in range(3):
-                try:
-                    data = await asyncio.wait_for(websocket.recv(), timeout=5.0)
-                    print(f"📥 收到数据 {i+1}:", data)
-                except asyncio.TimeoutError:
-                    print(f"⏰ 等待数据超时 {i+1}")
-                    break
+            try:
+                await asyncio.wait_for(reader, timeout=RECEIVE_TIMEOUT)
+            except asyncio.TimeoutError:
+                print("⏰ 等待数据结束")
                     
     except Exception as e:
         print(f"❌ WebSocket 连接失败: {e}")